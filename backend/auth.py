@@ -4,22 +4,130 @@ Authentication module with JWT token management and password hashing
 import jwt
 import bcrypt
 import os
+import asyncio
+import time
+import hashlib
+import secrets
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable
 from pydantic import BaseModel, EmailStr
 import logging
+from metrics import AUTH_LATENCY, AUTH_QUEUE_WAIT
 
 logger = logging.getLogger(__name__)
 
 # Configuration
 JWT_SECRET = os.environ.get('JWT_SECRET', 'your-super-secret-jwt-key-change-this-in-production')
 JWT_ALGORITHM = 'HS256'
-JWT_EXPIRES_IN = os.environ.get('JWT_EXPIRES_IN', '7d')
+JWT_EXPIRES_IN = os.environ.get('JWT_EXPIRES_IN', '15m')  # short-lived access tokens
+REFRESH_TOKEN_EXPIRES_IN = os.environ.get('REFRESH_TOKEN_EXPIRES_IN', '30d')
+
+# Password hashing pool configuration
+HASH_EXECUTOR = os.environ.get('HASH_EXECUTOR', 'thread')  # "thread" or "process"
+HASH_MAX_WORKERS = int(os.environ.get('HASH_MAX_WORKERS', str(min(4, os.cpu_count() or 1))))
+HASH_MAX_CONCURRENCY = int(os.environ.get('HASH_MAX_CONCURRENCY', str(HASH_MAX_WORKERS)))
+
+def parse_duration(value: str, default: timedelta) -> timedelta:
+    """Parse durations such as 15m, 12h or 7d"""
+    units = {'s': 'seconds', 'm': 'minutes', 'h': 'hours', 'd': 'days'}
+    try:
+        return timedelta(**{units[value[-1]]: int(value[:-1])})
+    except (KeyError, ValueError, IndexError):
+        return default
 
 class TokenData(BaseModel):
     user_id: str
     email: str
     user_type: str
+    expires_at: Optional[float] = None  # epoch seconds
+
+class HashingExecutor:
+    """Bounded worker pool that keeps bcrypt work off the event loop"""
+
+    def __init__(self, kind: str = 'thread', max_workers: int = 4, max_concurrency: Optional[int] = None):
+        if kind not in ('thread', 'process'):
+            raise ValueError(f"Unknown hashing executor kind: {kind}")
+        self.kind = kind
+        self.max_workers = max(1, max_workers)
+        self.max_concurrency = max(1, max_concurrency or self.max_workers)
+        self._executor: Optional[Executor] = None
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        # Metrics
+        self.waiting = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.total_run_seconds = 0.0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == 'process':
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix='bcrypt'
+                )
+        return self._executor
+
+    async def run(self, func: Callable, *args):
+        """Run a hashing function in the pool, waiting for a free slot first"""
+        queued_at = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        started_at = time.perf_counter()
+        wait = started_at - queued_at
+        AUTH_QUEUE_WAIT.observe(wait)
+        self.total_wait_seconds += wait
+        self.max_wait_seconds = max(self.max_wait_seconds, wait)
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._get_executor(), func, *args)
+            self.completed += 1
+            return result
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            elapsed = time.perf_counter() - started_at
+            AUTH_LATENCY.observe(elapsed, func.__name__)
+            self.total_run_seconds += elapsed
+            self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of queue depth and timing counters"""
+        finished = self.completed + self.failed
+        return {
+            'kind': self.kind,
+            'max_workers': self.max_workers,
+            'max_concurrency': self.max_concurrency,
+            'queue_depth': self.waiting,
+            'in_flight': self.in_flight,
+            'completed': self.completed,
+            'failed': self.failed,
+            'avg_wait_ms': (self.total_wait_seconds / finished * 1000) if finished else 0.0,
+            'max_wait_ms': self.max_wait_seconds * 1000,
+            'avg_run_ms': (self.total_run_seconds / finished * 1000) if finished else 0.0,
+        }
+
+    def shutdown(self, wait: bool = True):
+        """Stop the worker pool"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+# Global hashing pool
+hashing_executor = HashingExecutor(HASH_EXECUTOR, HASH_MAX_WORKERS, HASH_MAX_CONCURRENCY)
 
 class AuthManager:
     @staticmethod
@@ -38,20 +146,42 @@ class AuthManager:
             logger.error(f"Password verification error: {e}")
             return False
     
+    @staticmethod
+    async def hash_password_async(password: str) -> str:
+        """Hash a password in the hashing pool without blocking the event loop"""
+        return await hashing_executor.run(AuthManager.hash_password, password)
+    
+    @staticmethod
+    async def verify_password_async(password: str, hashed_password: str) -> bool:
+        """Verify a password in the hashing pool without blocking the event loop"""
+        return await hashing_executor.run(AuthManager.verify_password, password, hashed_password)
+    
+    @staticmethod
+    def access_token_lifetime() -> timedelta:
+        return parse_duration(JWT_EXPIRES_IN, timedelta(minutes=15))
+    
+    @staticmethod
+    def refresh_token_lifetime() -> timedelta:
+        return parse_duration(REFRESH_TOKEN_EXPIRES_IN, timedelta(days=30))
+    
+    @staticmethod
+    def create_refresh_token() -> tuple[str, str]:
+        """Create an opaque refresh token; returns (token, hash to store)"""
+        token = secrets.token_urlsafe(48)
+        return token, AuthManager.hash_refresh_token(token)
+    
+    @staticmethod
+    def hash_refresh_token(token: str) -> str:
+        """Refresh tokens are high-entropy random values, so a fast hash is enough to store them"""
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+    
     @staticmethod
     def create_access_token(user_data: Dict[str, Any]) -> str:
         """Create a JWT access token"""
+        started = time.perf_counter()
         try:
-            # Calculate expiration time
-            if JWT_EXPIRES_IN.endswith('d'):
-                days = int(JWT_EXPIRES_IN[:-1])
-                expire = datetime.now(timezone.utc) + timedelta(days=days)
-            elif JWT_EXPIRES_IN.endswith('h'):
-                hours = int(JWT_EXPIRES_IN[:-1])
-                expire = datetime.now(timezone.utc) + timedelta(hours=hours)
-            else:
-                # Default to 7 days
-                expire = datetime.now(timezone.utc) + timedelta(days=7)
+            # Calculate expiration time (default to 15 minutes)
+            expire = datetime.now(timezone.utc) + AuthManager.access_token_lifetime()
             
             # Create token payload
             payload = {
@@ -70,10 +200,13 @@ class AuthManager:
         except Exception as e:
             logger.error(f"Token creation error: {e}")
             raise
+        finally:
+            AUTH_LATENCY.observe(time.perf_counter() - started, "create_access_token")
     
     @staticmethod
     def verify_token(token: str) -> Optional[TokenData]:
         """Verify and decode a JWT token"""
+        started = time.perf_counter()
         try:
             payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
             
@@ -84,18 +217,21 @@ class AuthManager:
             return TokenData(
                 user_id=payload['user_id'],
                 email=payload['email'],
-                user_type=payload.get('user_type', 'pending')
+                user_type=payload.get('user_type', 'pending'),
+                expires_at=payload.get('exp')
             )
             
         except jwt.ExpiredSignatureError:
             logger.warning("Token has expired")
             return None
         except jwt.InvalidTokenError as e:
-            logger.warning(f"Invalid token: {e}")
+            logger.warning("Invalid token: %s", e)
             return None
         except Exception as e:
-            logger.error(f"Token verification error: {e}")
+            logger.error("Token verification error: %s", e)
             return None
+        finally:
+            AUTH_LATENCY.observe(time.perf_counter() - started, "verify_token")
     
     @staticmethod
     def extract_token_from_header(authorization_header: str) -> Optional[str]:
@@ -0,0 +1,100 @@
+"""
+Booking slot availability calendar
+"""
+import logging
+import os
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+from periodic import Reloader
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+BOOKING_SLOTS = tuple(
+    slot.strip() for slot in os.environ.get(
+        'BOOKING_SLOTS',
+        '09:00,09:30,10:00,10:30,11:00,11:30,14:00,14:30,15:00,15:30,16:00,16:30'
+    ).split(',') if slot.strip()
+)
+AVAILABILITY_MAX_DAYS = int(os.environ.get('AVAILABILITY_MAX_DAYS', '92'))
+AVAILABILITY_REFRESH_INTERVAL = float(os.environ.get('AVAILABILITY_REFRESH_INTERVAL', '60'))
+
+# Compound index that both enforces one booking per slot and covers the load query
+SLOT_INDEX = [("date", 1), ("time", 1)]
+
+class SlotCalendar:
+    """In-memory per-day sets of booked slots
+
+    The calendar is loaded from the (date, time) index with a covered query and
+    updated on every insert, so answering for a day is a set difference over
+    the configured slots. Bookings made by other workers are picked up when
+    they collide with a local insert or on the next reload, which a
+    background task started with `start()` runs every `refresh_interval`.
+    """
+
+    def __init__(self, slots=BOOKING_SLOTS, refresh_interval: float = AVAILABILITY_REFRESH_INTERVAL):
+        self.slots = tuple(slots)
+        self.refresh_interval = refresh_interval
+        self._booked: Dict[str, Set[str]] = defaultdict(set)
+        self._reloader = Reloader("Slot calendar reload", refresh_interval)
+        # Slots marked while a load is reading, re-applied to the loaded calendar
+        self._marked_during_load: Optional[List[Tuple[str, str]]] = None
+
+    async def load(self, collection, from_date: Optional[date] = None, max_age: Optional[float] = None):
+        """Rebuild the calendar from bookings on or after `from_date` (default today)"""
+        await self._reloader.run(lambda: self._read(collection, from_date or date.today()), max_age)
+
+    async def _read(self, collection, from_date: date):
+        booked: Dict[str, Set[str]] = defaultdict(set)
+        self._marked_during_load = []
+        try:
+            cursor = collection.find(
+                {"date": {"$gte": from_date.isoformat()}},
+                {"_id": 0, "date": 1, "time": 1}
+            ).hint(SLOT_INDEX)
+            async for booking in cursor:
+                booked[booking['date']].add(booking['time'])
+            for day, slot in self._marked_during_load:
+                booked[day].add(slot)
+        finally:
+            self._marked_during_load = None
+        self._booked = booked
+        logger.info(f"Loaded slot calendar with {sum(len(times) for times in booked.values())} booked slots")
+
+    async def ensure_loaded(self, collection):
+        """Load the calendar for the first request if startup did not"""
+        await self._reloader.ensure(lambda: self._read(collection, date.today()))
+
+    def start(self, collection):
+        """Reload every `refresh_interval`, moving the window forward each day"""
+        self._reloader.start(lambda: self._read(collection, date.today()))
+
+    async def stop(self):
+        await self._reloader.stop()
+
+    def mark_booked(self, day: str, slot: str):
+        self._booked[day].add(slot)
+        if self._marked_during_load is not None:
+            self._marked_during_load.append((day, slot))
+
+    def is_booked(self, day: str, slot: str) -> bool:
+        return slot in self._booked.get(day, ())
+
+    def availability(self, start: date, end: date) -> List[Dict[str, Any]]:
+        """Free and booked configured slots for every day in [start, end]"""
+        days = []
+        current = start
+        while current <= end:
+            key = current.isoformat()
+            booked = self._booked.get(key, set())
+            days.append({
+                "date": key,
+                "available": [slot for slot in self.slots if slot not in booked],
+                "booked": [slot for slot in self.slots if slot in booked],
+            })
+            current += timedelta(days=1)
+        return days
+
+# Global slot calendar
+slot_calendar = SlotCalendar()
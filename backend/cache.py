@@ -0,0 +1,105 @@
+"""
+In-process TTL/LRU caching, used for authenticated principals
+"""
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+# Configuration
+PRINCIPAL_CACHE_SIZE = int(os.environ.get('PRINCIPAL_CACHE_SIZE', '10000'))
+PRINCIPAL_CACHE_TTL = float(os.environ.get('PRINCIPAL_CACHE_TTL', '60'))
+
+class TTLCache:
+    """Least-recently-used cache whose entries also expire after a time-to-live"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return a live entry and mark it recently used, or None"""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Store an entry, evicting the least recently used one when full"""
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Hashable):
+        """Drop an entry if present"""
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+class PrincipalCache:
+    """Caches decoded token claims by token and user objects by user id"""
+
+    def __init__(self, maxsize: int = PRINCIPAL_CACHE_SIZE, ttl: float = PRINCIPAL_CACHE_TTL):
+        self.claims = TTLCache(maxsize, ttl)
+        self.users = TTLCache(maxsize, ttl)
+
+    def get_claims(self, token: str):
+        return self.claims.get(token)
+
+    def set_claims(self, token: str, token_data, expires_at: Optional[float] = None):
+        """Cache decoded claims, never beyond the token's own expiry (epoch seconds)"""
+        ttl = None if expires_at is None else expires_at - time.time()
+        self.claims.set(token, token_data, ttl)
+
+    def get_user(self, user_id: str):
+        return self.users.get(user_id)
+
+    def refresh_user(self, user):
+        """Replace the cached user after a profile write"""
+        self.users.set(user.id, user)
+
+    def invalidate_user(self, user_id: str):
+        self.users.pop(user_id)
+
+    def clear(self):
+        self.claims.clear()
+        self.users.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {'claims': self.claims.stats(), 'users': self.users.stats()}
+
+# Global principal cache
+principal_cache = PrincipalCache()
@@ -1,75 +1,439 @@
 """
 Database initialization and management module
+
+Upgrading a database created before the unique (date, time) booking index:
+run `python database.py dedupe-bookings --apply` first, then
+`python database.py migrate`. Startup refuses to build the index over
+double-booked slots and names the command instead.
 """
 import asyncio
+import hashlib
+import json
 import logging
+import threading
+import time
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring, IndexModel, ASCENDING, ReplaceOne
 from pymongo.errors import CollectionInvalid
 import os
 from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from mongo_codec import CODEC_OPTIONS, migrate_datetimes
+from periodic import PeriodicTask
 
 logger = logging.getLogger(__name__)
 
+def _env_flag(name: str, default: bool) -> bool:
+    return os.environ.get(name, str(default)).lower() in ('1', 'true', 'yes', 'on')
+
+def client_settings() -> Dict[str, Any]:
+    """Connection pool, timeout, compression and retry options from the environment"""
+    settings = {
+        'maxPoolSize': int(os.environ.get('MONGO_MAX_POOL_SIZE', '100')),
+        'minPoolSize': int(os.environ.get('MONGO_MIN_POOL_SIZE', '0')),
+        'maxIdleTimeMS': int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', '60000')),
+        'serverSelectionTimeoutMS': int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000')),
+        'connectTimeoutMS': int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', '10000')),
+        'retryWrites': _env_flag('MONGO_RETRY_WRITES', True),
+        'retryReads': _env_flag('MONGO_RETRY_READS', True),
+        'appname': os.environ.get('MONGO_APP_NAME', 'yeyo-lab-api'),
+        'tz_aware': CODEC_OPTIONS.tz_aware,
+        'tzinfo': CODEC_OPTIONS.tzinfo,
+    }
+    if os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS'):
+        settings['waitQueueTimeoutMS'] = int(os.environ['MONGO_WAIT_QUEUE_TIMEOUT_MS'])
+    if os.environ.get('MONGO_SOCKET_TIMEOUT_MS'):
+        settings['socketTimeoutMS'] = int(os.environ['MONGO_SOCKET_TIMEOUT_MS'])
+    if os.environ.get('MONGO_COMPRESSORS'):
+        settings['compressors'] = os.environ['MONGO_COMPRESSORS']  # e.g. "zstd,snappy,zlib"
+    return settings
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Tracks open, checked-out and waiting connections across the client's pools"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open = 0
+        self.checked_out = 0
+        self.waiting = 0
+        self.checkout_failures = 0
+        self.pool_clears = 0
+
+    def _add(self, field: str, delta: int):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + delta)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._add('pool_clears', 1)
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._add('open', 1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._add('open', -1)
+
+    def connection_check_out_started(self, event):
+        self._add('waiting', 1)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.waiting -= 1
+            self.checkout_failures += 1
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.waiting -= 1
+            self.checked_out += 1
+
+    def connection_checked_in(self, event):
+        self._add('checked_out', -1)
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'open': self.open,
+                'checked_out': self.checked_out,
+                'waiting': self.waiting,
+                'checkout_failures': self.checkout_failures,
+                'pool_clears': self.pool_clears,
+            }
+
+class MongoClientRegistry:
+    """Owns the single Motor client shared by every handler and by Database"""
+
+    def __init__(self):
+        self._client: Optional[AsyncIOMotorClient] = None
+        self.pool_stats = PoolStatsListener()
+        self._listeners: List[Any] = [self.pool_stats]
+
+    def add_listener(self, listener):
+        """Register a pymongo event listener; only clients created afterwards will use it"""
+        if self._client is not None:
+            logger.warning(f"Mongo client already created; {type(listener).__name__} will not receive events")
+        self._listeners.append(listener)
+
+    def get_client(self) -> AsyncIOMotorClient:
+        """Return the shared client, creating it on first use"""
+        if self._client is None:
+            mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+            self._client = AsyncIOMotorClient(
+                mongo_url,
+                event_listeners=list(self._listeners),
+                **client_settings()
+            )
+        return self._client
+
+    def set_client(self, client):
+        """Install an externally created client (e.g. an in-memory stand-in for benchmarks)"""
+        self._client = client
+
+    def get_db(self, db_name: Optional[str] = None):
+        return self.get_client()[db_name or os.environ.get('DB_NAME', 'yeyo_lab')]
+
+    def pool_snapshot(self) -> Dict[str, int]:
+        return self.pool_stats.snapshot()
+
+    def close(self):
+        """Close the shared client; the next get_client() opens a fresh one"""
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+# Global client registry
+registry = MongoClientRegistry()
+
+def get_client() -> AsyncIOMotorClient:
+    """Get the shared Mongo client"""
+    return registry.get_client()
+
+def close_client():
+    """Close the shared Mongo client"""
+    registry.close()
+
+# Health probing
+HEALTH_PROBE_INTERVAL = float(os.environ.get('HEALTH_PROBE_INTERVAL', '5'))
+HEALTH_PROBE_TIMEOUT = float(os.environ.get('HEALTH_PROBE_TIMEOUT', '2'))
+HEALTH_MAX_STALENESS = float(os.environ.get('HEALTH_MAX_STALENESS', '30'))
+
+class HealthProber:
+    """Pings Mongo on an interval and keeps the latest result in memory
+
+    Health endpoints and Database.health_check read the cached result, so
+    probe traffic from load balancers never reaches Mongo and a slow server
+    cannot make the probes themselves time out. A probe older than
+    `max_staleness` counts as not ready, which covers a stuck probe task.
+    """
+
+    def __init__(self, interval: float = HEALTH_PROBE_INTERVAL,
+                 timeout: float = HEALTH_PROBE_TIMEOUT,
+                 max_staleness: float = HEALTH_MAX_STALENESS):
+        self.interval = interval
+        self.timeout = timeout
+        self.max_staleness = max_staleness
+        self._prober = PeriodicTask("Database health probe", self.probe, interval, run_first=True)
+        self._probe_lock = asyncio.Lock()
+
+        # Latest result
+        self.ok: Optional[bool] = None
+        self.latency_ms: Optional[float] = None
+        self.error: Optional[str] = None
+        self.checked_at: Optional[float] = None  # monotonic
+        self.last_success_at: Optional[datetime] = None
+        self.consecutive_failures = 0
+        self.pool: Dict[str, int] = {}
+
+    async def probe(self) -> bool:
+        """Ping once and record the outcome; concurrent callers share one ping"""
+        if self._probe_lock.locked():
+            async with self._probe_lock:
+                return bool(self.ok)
+        async with self._probe_lock:
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(get_client().admin.command('ping'), self.timeout)
+                self.ok, self.error = True, None
+                self.last_success_at = datetime.now(timezone.utc)
+                self.consecutive_failures = 0
+            except Exception as e:
+                if self.ok is not False:
+                    logger.error(f"Database health probe failed: {e!r}")
+                self.ok, self.error = False, repr(e)
+                self.consecutive_failures += 1
+            self.latency_ms = (time.perf_counter() - started) * 1000
+            self.checked_at = time.monotonic()
+            self.pool = registry.pool_snapshot()
+            return self.ok
+
+    def staleness(self) -> Optional[float]:
+        """Seconds since the last completed probe"""
+        return None if self.checked_at is None else time.monotonic() - self.checked_at
+
+    async def refresh(self, max_age: float) -> bool:
+        """Cached result if it is younger than `max_age`, otherwise probe now"""
+        staleness = self.staleness()
+        if staleness is None or staleness > max_age:
+            return await self.probe()
+        return bool(self.ok)
+
+    def is_ready(self) -> bool:
+        staleness = self.staleness()
+        return bool(self.ok) and staleness is not None and staleness <= self.max_staleness
+
+    def snapshot(self) -> Dict[str, Any]:
+        staleness = self.staleness()
+        return {
+            'ready': self.is_ready(),
+            'database': 'connected' if self.ok else 'disconnected',
+            'latency_ms': self.latency_ms,
+            'staleness_s': staleness,
+            'last_success_at': self.last_success_at,
+            'consecutive_failures': self.consecutive_failures,
+            'error': self.error,
+            'pool': self.pool,
+        }
+
+    def start(self):
+        """Probe now and then every `interval`"""
+        self._prober.start()
+
+    async def stop(self):
+        await self._prober.stop()
+
+# Global health prober
+health_prober = HealthProber()
+
+# Schema manifest: every collection and the indexes it must have
+SCHEMA_MANIFEST: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("email", ASCENDING)], unique=True),
+        IndexModel([("created_at", ASCENDING)]),
+        # Match index loads read investors and founders by type
+        IndexModel([("user_type", ASCENDING)]),
+    ],
+    "bookings": [
+        IndexModel([("email", ASCENDING)]),
+        # One booking per slot; also serves date-range filters
+        IndexModel([("date", ASCENDING), ("time", ASCENDING)], unique=True),
+        IndexModel([("created_at", ASCENDING)]),
+        IndexModel([("created_at", ASCENDING), ("id", ASCENDING)]),
+    ],
+    "email_subscriptions": [
+        IndexModel([("email", ASCENDING)], unique=True),
+        IndexModel([("created_at", ASCENDING)]),
+    ],
+    # Refresh tokens are stored hashed and expire through the TTL index
+    "refresh_tokens": [
+        IndexModel([("token_hash", ASCENDING)], unique=True),
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+    # Shared rate limiter windows (RATE_LIMIT_BACKEND=mongo); expired by TTL
+    "rate_limits": [
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+    # Dashboard counters, read by metric over a day range
+    "stats_rollups": [
+        IndexModel([("metric", ASCENDING), ("day", ASCENDING)]),
+    ],
+}
+
+# Unique index that rejects double bookings; older databases may violate it
+SLOT_INDEX_NAME = "date_1_time_1"
+# Where dedupe-bookings moves the later bookings of a double-booked slot
+BOOKING_CONFLICTS_COLLECTION = "booking_conflicts"
+
+class DuplicateSlotsError(RuntimeError):
+    """Existing bookings share a (date, time) slot, so the unique slot index cannot be built"""
+
+async def find_duplicate_slots(db) -> List[Dict[str, Any]]:
+    """Slots held by more than one booking, each with its booking ids oldest first"""
+    pipeline = [
+        {"$sort": {"created_at": 1, "id": 1}},
+        {"$group": {"_id": {"date": "$date", "time": "$time"}, "ids": {"$push": "$id"}}},
+        {"$match": {"ids.1": {"$exists": True}}},
+        {"$sort": {"_id.date": 1, "_id.time": 1}},
+    ]
+    return [
+        {"date": group["_id"]["date"], "time": group["_id"]["time"], "ids": group["ids"]}
+        async for group in db.bookings.aggregate(pipeline, allowDiskUse=True)
+    ]
+
+async def resolve_duplicate_slots(db, duplicates: List[Dict[str, Any]]) -> int:
+    """Keep the oldest booking of each slot and move the others to BOOKING_CONFLICTS_COLLECTION
+
+    Moved documents are upserted by _id before they are deleted, so an
+    interrupted run can simply be repeated. Returns the number moved.
+    """
+    moved = 0
+    for duplicate in duplicates:
+        kept, later = duplicate["ids"][0], duplicate["ids"][1:]
+        documents = await db.bookings.find({"id": {"$in": later}}).to_list(None)
+        if not documents:
+            continue
+        await db[BOOKING_CONFLICTS_COLLECTION].bulk_write([
+            ReplaceOne({"_id": document["_id"]}, {**document, "conflicts_with": kept}, upsert=True)
+            for document in documents
+        ])
+        await db.bookings.delete_many({"_id": {"$in": [document["_id"] for document in documents]}})
+        moved += len(documents)
+    return moved
+
+# Where the fingerprint of the last applied manifest is recorded
+SCHEMA_COLLECTION = "schema_migrations"
+
+# "auto" (skip when the stored fingerprint matches), "force" or "skip"
+SCHEMA_BOOTSTRAP = os.environ.get('SCHEMA_BOOTSTRAP', 'auto')
+
+def manifest_fingerprint() -> str:
+    """Stable hash of SCHEMA_MANIFEST, used to detect that it has already been applied"""
+    spec = {
+        name: sorted(
+            json.dumps({**index.document, 'key': list(index.document['key'].items())}, sort_keys=True)
+            for index in indexes
+        )
+        for name, indexes in SCHEMA_MANIFEST.items()
+    }
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode('utf-8')).hexdigest()
+
 class Database:
-    def __init__(self, mongo_url: str, db_name: str):
-        self.client = AsyncIOMotorClient(mongo_url)
-        self.db = self.client[db_name]
+    def __init__(self, db_name: Optional[str] = None):
+        self.client = get_client()
+        self.db = registry.get_db(db_name)
+        
+    async def initialize_collections(self, mode: Optional[str] = None):
+        """Bring collections and indexes in line with SCHEMA_MANIFEST
+
+        In "auto" mode a single lookup of the stored manifest fingerprint lets
+        already-migrated databases skip the diff entirely; "force" always diffs
+        and "skip" makes no database calls at all.
+        """
+        mode = mode or SCHEMA_BOOTSTRAP
+        if mode == 'skip':
+            logger.info("Schema bootstrap skipped")
+            return
         
-    async def initialize_collections(self):
-        """Initialize all required collections with proper indexes"""
         try:
-            # Users collection
-            try:
-                await self.db.create_collection("users")
-                logger.info("Created users collection")
-            except CollectionInvalid:
-                logger.info("Users collection already exists")
-            
-            # Create indexes for users
-            await self.db.users.create_index("email", unique=True)
-            await self.db.users.create_index("created_at")
-            
-            # Bookings collection
-            try:
-                await self.db.create_collection("bookings")
-                logger.info("Created bookings collection")
-            except CollectionInvalid:
-                logger.info("Bookings collection already exists")
-                
-            # Create indexes for bookings
-            await self.db.bookings.create_index("email")
-            await self.db.bookings.create_index("date")
-            await self.db.bookings.create_index("created_at")
+            if mode == 'auto' and await self.schema_is_current():
+                logger.info("Schema manifest already applied")
+                return
             
-            # Email subscriptions collection
-            try:
-                await self.db.create_collection("email_subscriptions")
-                logger.info("Created email_subscriptions collection")
-            except CollectionInvalid:
-                logger.info("Email subscriptions collection already exists")
-                
-            # Create indexes for email subscriptions
-            await self.db.email_subscriptions.create_index("email", unique=True)
-            await self.db.email_subscriptions.create_index("created_at")
-            
-            logger.info("Database initialization completed successfully")
+            created = await self.apply_manifest()
+            logger.info(f"Database initialization completed successfully ({created} indexes created)")
             
         except Exception as e:
             logger.error(f"Error initializing database: {e}")
             raise
     
-    async def health_check(self):
-        """Check database connection health"""
-        try:
-            await self.client.admin.command('ping')
-            return True
-        except Exception as e:
-            logger.error(f"Database health check failed: {e}")
-            return False
+    async def schema_is_current(self) -> bool:
+        """Check whether the stored fingerprint matches SCHEMA_MANIFEST"""
+        record = await self.db[SCHEMA_COLLECTION].find_one({"_id": "manifest"})
+        return bool(record) and record.get('fingerprint') == manifest_fingerprint()
+    
+    async def missing_indexes(self, existing: Optional[set] = None) -> Dict[str, List[IndexModel]]:
+        """Compare SCHEMA_MANIFEST with list_indexes for every collection concurrently"""
+        if existing is None:
+            existing = set(await self.db.list_collection_names())
+        
+        async def diff(name: str, indexes: List[IndexModel]) -> List[IndexModel]:
+            if name not in existing:
+                return list(indexes)
+            present = {index['name'] async for index in self.db[name].list_indexes()}
+            return [index for index in indexes if index.document['name'] not in present]
+        
+        names = list(SCHEMA_MANIFEST)
+        results = await asyncio.gather(*(diff(name, SCHEMA_MANIFEST[name]) for name in names))
+        return dict(zip(names, results))
+    
+    async def apply_manifest(self) -> int:
+        """Create missing collections and indexes, one create_indexes call per collection"""
+        existing = set(await self.db.list_collection_names())
+        missing = await self.missing_indexes(existing)
+        if "bookings" in existing and any(index.document['name'] == SLOT_INDEX_NAME for index in missing["bookings"]):
+            duplicates = await find_duplicate_slots(self.db)
+            if duplicates:
+                raise DuplicateSlotsError(
+                    f"{len(duplicates)} booking slots are held by more than one booking, so the unique "
+                    f"{SLOT_INDEX_NAME} index cannot be built; run `python database.py dedupe-bookings --apply` first"
+                )
+        
+        async def apply(name: str, indexes: List[IndexModel]):
+            if name not in existing:
+                try:
+                    await self.db.create_collection(name)
+                    logger.info(f"Created {name} collection")
+                except CollectionInvalid:
+                    pass
+            if indexes:
+                await self.db[name].create_indexes(indexes)
+                logger.info(f"Created indexes on {name}: {', '.join(index.document['name'] for index in indexes)}")
+        
+        await asyncio.gather(*(apply(name, indexes) for name, indexes in missing.items()))
+        await self.db[SCHEMA_COLLECTION].update_one(
+            {"_id": "manifest"},
+            {"$set": {"fingerprint": manifest_fingerprint(), "applied_at": datetime.now(timezone.utc)}},
+            upsert=True
+        )
+        return sum(len(indexes) for indexes in missing.values())
+    
+    async def health_check(self, max_age: float = HEALTH_PROBE_INTERVAL) -> bool:
+        """Check database connection health, reusing a recent probe result"""
+        return await health_prober.refresh(max_age)
     
     async def close(self):
-        """Close database connection"""
-        self.client.close()
+        """Close the shared database connection"""
+        close_client()
 
 # Global database instance
 db_instance = None
@@ -78,20 +442,17 @@ async def get_database():
     """Get database instance"""
     global db_instance
     if db_instance is None:
-        mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
-        db_name = os.environ.get('DB_NAME', 'yeyo_lab')
-        db_instance = Database(mongo_url, db_name)
+        db_instance = Database()
         await db_instance.initialize_collections()
     return db_instance.db
 
 async def init_database():
     """Initialize database on startup"""
+    global db_instance
     try:
-        mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
-        db_name = os.environ.get('DB_NAME', 'yeyo_lab')
-        
-        db = Database(mongo_url, db_name)
+        db = Database()
         await db.initialize_collections()
+        db_instance = db
         
         # Test connection
         health = await db.health_check()
@@ -107,8 +468,73 @@ async def init_database():
         raise
 
 if __name__ == "__main__":
-    # Run database initialization
-    async def main():
-        await init_database()
+    import typer
+    
+    cli = typer.Typer(help="Database schema management")
+    
+    @cli.command()
+    def migrate(force: bool = typer.Option(True, help="Diff against the live indexes even if the fingerprint matches")):
+        """Apply SCHEMA_MANIFEST ahead of deploy so workers can start with SCHEMA_BOOTSTRAP=skip"""
+        async def main():
+            await Database().initialize_collections('force' if force else 'auto')
+            close_client()
         
-    asyncio.run(main())
\ No newline at end of file
+        asyncio.run(main())
+    
+    @cli.command()
+    def status():
+        """List indexes from SCHEMA_MANIFEST that are missing in the database"""
+        async def main():
+            database = Database()
+            missing = await database.missing_indexes()
+            current = await database.schema_is_current()
+            close_client()
+            return missing, current
+        
+        missing, current = asyncio.run(main())
+        typer.echo(f"Manifest fingerprint {'matches' if current else 'does not match'} the database")
+        for name, indexes in missing.items():
+            for index in indexes:
+                typer.echo(f"missing: {name}.{index.document['name']}")
+        if any(missing.values()):
+            raise typer.Exit(code=1)
+    
+    @cli.command("dedupe-bookings")
+    def dedupe_bookings(apply: bool = typer.Option(False, help="Move the later bookings of each slot instead of only listing them")):
+        """Resolve double-booked slots; must run before the unique (date, time) index is built"""
+        async def main():
+            try:
+                database = registry.get_db()
+                duplicates = await find_duplicate_slots(database)
+                moved = await resolve_duplicate_slots(database, duplicates) if apply else 0
+                return duplicates, moved
+            finally:
+                close_client()
+        
+        duplicates, moved = asyncio.run(main())
+        for duplicate in duplicates:
+            typer.echo(f"{duplicate['date']} {duplicate['time']}: keeping {duplicate['ids'][0]}, later {', '.join(duplicate['ids'][1:])}")
+        if apply:
+            typer.echo(f"Moved {moved} bookings to {BOOKING_CONFLICTS_COLLECTION}")
+        elif duplicates:
+            typer.echo(f"{len(duplicates)} double-booked slots; re-run with --apply to resolve them")
+            raise typer.Exit(code=1)
+        else:
+            typer.echo("No double-booked slots")
+    
+    @cli.command("migrate-dates")
+    def migrate_dates(
+        collection: List[str] = typer.Option(["users", "bookings", "email_subscriptions"], help="Collections to convert"),
+        batch_size: int = typer.Option(1000, help="Documents per bulk write")
+    ):
+        """Convert ISO-string datetimes to native BSON dates; safe to interrupt and re-run"""
+        async def main():
+            try:
+                return await migrate_datetimes(registry.get_db(), collection, batch_size)
+            finally:
+                close_client()
+        
+        for name, count in asyncio.run(main()).items():
+            typer.echo(f"{name}: {count} documents converted")
+    
+    cli()
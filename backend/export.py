@@ -0,0 +1,191 @@
+"""
+Chunked CSV and Parquet export of bookings and email subscriptions
+
+Usage: python export.py bookings --format parquet --output bookings.parquet
+"""
+import asyncio
+import io
+import logging
+import os
+from typing import Any, AsyncIterator, Dict, List, Tuple
+import pandas as pd
+from mongo_codec import from_mongo
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', '5000'))
+
+# Exported columns per collection, matching the public API models
+EXPORT_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "bookings": ("id", "name", "email", "date", "time", "message", "created_at"),
+    "email_subscriptions": ("id", "email", "created_at"),
+}
+DATETIME_COLUMNS = ("created_at",)
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+class ExportUnavailable(Exception):
+    """The requested format needs an optional dependency that is not installed"""
+
+async def iter_frames(collection, fields: Tuple[str, ...], batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[pd.DataFrame]:
+    """Read the collection in _id order and yield one DataFrame per `batch_size` documents"""
+    projection = {"_id": 0, **{field: 1 for field in fields}}
+    cursor = collection.find({}, projection).sort("_id", 1).batch_size(batch_size)
+    rows: List[Dict[str, Any]] = []
+    async for document in cursor:
+        rows.append(from_mongo(document))
+        if len(rows) >= batch_size:
+            yield _to_frame(rows, fields)
+            rows = []
+    if rows:
+        yield _to_frame(rows, fields)
+
+def _to_frame(rows: List[Dict[str, Any]], fields: Tuple[str, ...]) -> pd.DataFrame:
+    frame = pd.DataFrame.from_records(rows, columns=list(fields))
+    for column in DATETIME_COLUMNS:
+        if column in frame:
+            frame[column] = pd.to_datetime(frame[column], utc=True).dt.floor("us")
+    return frame
+
+class CsvEncoder:
+    """Encodes frames as CSV; only the first frame carries the header row"""
+
+    def __init__(self, fields: Tuple[str, ...]):
+        self.fields = fields
+        self._header_written = False
+
+    def start(self) -> bytes:
+        return b""
+
+    def encode(self, frame: pd.DataFrame) -> bytes:
+        data = frame.to_csv(index=False, header=not self._header_written, date_format="%Y-%m-%dT%H:%M:%S.%fZ")
+        self._header_written = True
+        return data.encode("utf-8")
+
+    def finish(self) -> bytes:
+        # An empty export still gets its header
+        if self._header_written:
+            return b""
+        return (",".join(self.fields) + "\n").encode("utf-8")
+
+class _StreamSink(io.RawIOBase):
+    """Write-only file that hands buffered bytes back on drain() but keeps counting offsets"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+class ParquetEncoder:
+    """Encodes frames as row groups of a single Parquet file (requires pyarrow)"""
+
+    def __init__(self, fields: Tuple[str, ...]):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ExportUnavailable("Parquet export requires pyarrow")
+        self._pa = pa
+        self.schema = pa.schema([
+            # Legacy ISO-string datetimes carry microseconds; a coarser unit fails the safe cast mid-stream
+            (field, pa.timestamp("us", tz="UTC") if field in DATETIME_COLUMNS else pa.string())
+            for field in fields
+        ])
+        self._sink = _StreamSink()
+        self._writer = pq.ParquetWriter(self._sink, self.schema, compression="snappy")
+
+    def start(self) -> bytes:
+        return self._sink.drain()
+
+    def encode(self, frame: pd.DataFrame) -> bytes:
+        table = self._pa.Table.from_pandas(frame, schema=self.schema, preserve_index=False)
+        self._writer.write_table(table)
+        return self._sink.drain()
+
+    def finish(self) -> bytes:
+        self._writer.close()
+        return self._sink.drain()
+
+def create_encoder(output_format: str, fields: Tuple[str, ...]):
+    if output_format == "csv":
+        return CsvEncoder(fields)
+    if output_format == "parquet":
+        return ParquetEncoder(fields)
+    raise ValueError(f"Unknown export format: {output_format}")
+
+async def export_collection(collection, name: str, output_format: str,
+                            batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[bytes]:
+    """Stream `collection` encoded as CSV or Parquet, one batch in memory at a time
+
+    The encoder is built before the first chunk, so a missing optional
+    dependency raises ExportUnavailable to the caller rather than mid-stream.
+    Encoding runs in a worker thread to keep the event loop responsive.
+    """
+    fields = EXPORT_FIELDS[name]
+    encoder = create_encoder(output_format, fields)
+
+    async def stream():
+        rows = 0
+        yield encoder.start()
+        async for frame in iter_frames(collection, fields, batch_size):
+            rows += len(frame)
+            yield await asyncio.to_thread(encoder.encode, frame)
+        yield await asyncio.to_thread(encoder.finish)
+        logger.info(f"Exported {rows} {name} rows as {output_format}")
+
+    return stream()
+
+if __name__ == "__main__":
+    import sys
+    import typer
+    from database import registry, close_client
+
+    def main(
+        collection: str = typer.Argument(..., help=f"One of: {', '.join(EXPORT_FIELDS)}"),
+        output_format: str = typer.Option("csv", "--format", help="csv or parquet"),
+        output: str = typer.Option("-", help="Output file; '-' writes to stdout"),
+        batch_size: int = typer.Option(EXPORT_BATCH_SIZE, help="Documents per chunk")
+    ):
+        """Export a collection without loading it into memory"""
+        if collection not in EXPORT_FIELDS:
+            raise typer.BadParameter(f"Unknown collection: {collection}")
+        if output_format not in EXPORT_FORMATS:
+            raise typer.BadParameter(f"Unknown format: {output_format}")
+
+        async def run():
+            handle = sys.stdout.buffer if output == "-" else open(output, "wb")
+            try:
+                chunks = await export_collection(registry.get_db()[collection], collection, output_format, batch_size)
+                async for chunk in chunks:
+                    handle.write(chunk)
+            finally:
+                if handle is not sys.stdout.buffer:
+                    handle.close()
+                close_client()
+
+        try:
+            asyncio.run(run())
+        except ExportUnavailable as e:
+            typer.echo(str(e), err=True)
+            raise typer.Exit(code=1)
+
+    typer.run(main)
@@ -0,0 +1,340 @@
+"""
+Investor–founder matching over a hashed TF-IDF similarity index
+"""
+import asyncio
+import logging
+import math
+import os
+import re
+import time
+import zlib
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from periodic import Reloader
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+MATCH_FEATURES = int(os.environ.get('MATCH_FEATURES', '1024'))
+MATCH_BUILD_BATCH_SIZE = int(os.environ.get('MATCH_BUILD_BATCH_SIZE', '2000'))
+MATCH_REFRESH_INTERVAL = float(os.environ.get('MATCH_REFRESH_INTERVAL', '300'))
+MATCH_MAX_RESULTS = int(os.environ.get('MATCH_MAX_RESULTS', '50'))
+
+# Investors are matched with founders and vice versa
+COUNTERPART = {"investor": "founder", "founder": "investor"}
+
+# Profile fields the index reads and the fields it keeps for displaying matches
+MATCH_PROJECTION = {"_id": 0, "id": 1, "name": 1, "user_type": 1, "company": 1, "additional_info": 1}
+DISPLAY_FIELDS = ("id", "name", "user_type", "company")
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have in into is it its of on or our that the their this to we "
+    "with will you your".split()
+)
+
+# A profile as hashed term frequencies: (feature indices, values)
+SparseVector = Tuple[np.ndarray, np.ndarray]
+# A batch of weighted profiles: (nonzeros per profile, feature indices, values)
+WeighedRows = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased words plus adjacent-word bigrams, without stopwords"""
+    words = [word for word in TOKEN_PATTERN.findall(text.lower()) if len(word) > 1 and word not in STOPWORDS]
+    return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+def profile_text(user: Dict[str, Any]) -> str:
+    return " ".join(filter(None, (user.get('company'), user.get('additional_info'))))
+
+def hash_terms(text: str, features: int = MATCH_FEATURES) -> SparseVector:
+    """Signed feature hashing of log-scaled term counts
+
+    crc32 is stable across processes (unlike hash()), and the sign bit keeps
+    colliding terms from systematically inflating each other.
+    """
+    buckets: Dict[int, float] = {}
+    for term, count in Counter(tokenize(text)).items():
+        digest = zlib.crc32(term.encode("utf-8"))
+        index = digest % features
+        sign = 1.0 if digest & 0x80000000 else -1.0
+        buckets[index] = buckets.get(index, 0.0) + sign * (1.0 + math.log(count))
+    indices = np.fromiter(buckets.keys(), dtype=np.int32, count=len(buckets))
+    values = np.fromiter(buckets.values(), dtype=np.float32, count=len(buckets))
+    return indices, values
+
+class _Side:
+    """Sparse row-normalized vectors for one user type
+
+    A profile only touches the few dozen feature buckets its terms hash
+    into, so rows are stored as flat (owner row, feature index, value)
+    entries, 12 bytes each, instead of `features` float32 columns. A profile
+    of 40 terms costs about 0.5KB rather than 4KB at 1024 features, and the
+    rebuilt index that briefly coexists with the live one during a reload
+    is as small. Rows replaced or removed leave zeroed entries behind; they
+    are compacted away when the entry arrays run out of room, and arrays
+    grow by a quarter rather than doubling.
+    """
+
+    def __init__(self, features: int, capacity: int = 256, entry_capacity: int = 4096):
+        self.features = features
+        # Per row: its span in the entry arrays
+        self.starts = np.zeros(capacity, dtype=np.int64)
+        self.lengths = np.zeros(capacity, dtype=np.int32)
+        self.active = np.zeros(capacity, dtype=bool)
+        self.user_ids: List[Optional[str]] = [None] * capacity
+        self.rows: Dict[str, int] = {}
+        self.free: List[int] = []
+        self.size = 0  # rows ever used; rows past this are untouched
+        # Entries
+        self.owners = np.zeros(entry_capacity, dtype=np.int32)
+        self.indices = np.zeros(entry_capacity, dtype=np.int32)
+        self.values = np.zeros(entry_capacity, dtype=np.float32)
+        self.used = 0  # entries ever appended since the last compaction
+        self.live = 0  # entries belonging to current rows
+        # Start of every run of entries with the same owner, rebuilt after appends
+        self._segments: Optional[np.ndarray] = None
+
+    @staticmethod
+    def _capacity(current: int, needed: int) -> int:
+        return max(needed, current + current // 4)
+
+    def _grow_rows(self, needed: int):
+        capacity = len(self.active)
+        if needed <= capacity:
+            return
+        capacity = self._capacity(capacity, needed)
+        self.starts = np.resize(self.starts, capacity)
+        self.lengths = np.resize(self.lengths, capacity)
+        self.active = np.resize(self.active, capacity)
+        self.lengths[self.size:] = 0
+        self.active[self.size:] = False
+        self.user_ids.extend([None] * (capacity - len(self.user_ids)))
+
+    def _reserve(self, count: int):
+        """Room for `count` more entries, compacting before growing"""
+        if self.used + count <= len(self.values):
+            return
+        rows = np.flatnonzero(self.active[:self.size])
+        lengths = self.lengths[rows].astype(np.int64)
+        new_starts = np.cumsum(lengths) - lengths
+        # Old position of every live entry, in row order
+        gather = np.arange(self.live) + np.repeat(self.starts[rows] - new_starts, lengths)
+        capacity = self._capacity(self.live, self.live + count)
+        for name in ('owners', 'indices', 'values'):
+            entries = np.zeros(capacity, dtype=getattr(self, name).dtype)
+            entries[:self.live] = getattr(self, name)[gather]
+            setattr(self, name, entries)
+        self.starts[rows] = new_starts
+        self.used = self.live
+        self._segments = None
+
+    def _append(self, rows: np.ndarray, lengths: np.ndarray, indices: np.ndarray, values: np.ndarray):
+        self._reserve(len(indices))
+        end = self.used + len(indices)
+        self.owners[self.used:end] = np.repeat(rows, lengths)
+        self.indices[self.used:end] = indices
+        self.values[self.used:end] = values
+        self.starts[rows] = self.used + np.cumsum(lengths) - lengths
+        self.lengths[rows] = lengths
+        self.active[rows] = True
+        self.used = end
+        self.live += len(indices)
+        self._segments = None
+
+    def _clear(self, row: int):
+        start, length = self.starts[row], self.lengths[row]
+        self.values[start:start + length] = 0.0
+        self.lengths[row] = 0
+        self.live -= int(length)
+
+    def put_many(self, user_ids: List[str], weighed: WeighedRows):
+        """Append a batch of new users"""
+        start = self.size
+        self._grow_rows(start + len(user_ids))
+        self._append(np.arange(start, start + len(user_ids)), *weighed)
+        for offset, user_id in enumerate(user_ids):
+            self.user_ids[start + offset] = user_id
+            self.rows[user_id] = start + offset
+        self.size += len(user_ids)
+
+    def put(self, user_id: str, weighed: WeighedRows):
+        row = self.rows.get(user_id)
+        if row is None:
+            if self.free:
+                row = self.free.pop()
+            else:
+                self._grow_rows(self.size + 1)
+                row = self.size
+                self.size += 1
+            self.rows[user_id] = row
+            self.user_ids[row] = user_id
+        else:
+            self._clear(row)
+        self._append(np.array([row]), *weighed)
+
+    def remove(self, user_id: str):
+        row = self.rows.pop(user_id, None)
+        if row is not None:
+            self._clear(row)
+            self.active[row] = False
+            self.user_ids[row] = None
+            self.free.append(row)
+
+    def vector(self, user_id: str) -> Optional[np.ndarray]:
+        """The profile's row as a dense vector, for use as a query"""
+        row = self.rows.get(user_id)
+        if row is None:
+            return None
+        start, length = self.starts[row], self.lengths[row]
+        vector = np.zeros(self.features, dtype=np.float32)
+        vector[self.indices[start:start + length]] = self.values[start:start + length]
+        return vector
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        """Dot product of every row with a dense query; inactive rows score 0
+
+        A row's entries are contiguous, so products are summed per run of
+        equal owners with reduceat and only the run sums are scattered to
+        rows (a run of zeroed entries left by a replaced row adds nothing).
+        """
+        used = self.used
+        if not used:
+            return np.zeros(self.size)
+        if self._segments is None:
+            owners = self.owners[:used]
+            self._segments = np.concatenate(([0], np.flatnonzero(owners[1:] != owners[:-1]) + 1))
+        products = query.take(self.indices[:used])
+        products *= self.values[:used]
+        sums = np.add.reduceat(products, self._segments)
+        return np.bincount(self.owners[self._segments], weights=sums, minlength=self.size)[:self.size]
+
+def weigh(terms: List[SparseVector], idf: np.ndarray) -> WeighedRows:
+    """IDF-weighted, L2-normalized sparse rows for a batch of hashed profiles"""
+    lengths = np.fromiter((len(indices) for indices, _ in terms), dtype=np.int64, count=len(terms))
+    indices = np.concatenate([indices for indices, _ in terms] or [np.zeros(0, dtype=np.int32)])
+    values = np.concatenate([values for _, values in terms] or [np.zeros(0, dtype=np.float32)]) * idf[indices]
+    rows = np.repeat(np.arange(len(terms)), lengths)
+    norms = np.sqrt(np.bincount(rows, weights=values.astype(np.float64) ** 2, minlength=len(terms)))[rows]
+    np.divide(values, norms, out=values, where=norms > 0)
+    return lengths, indices, values
+
+def build_index(users: List[Dict[str, Any]], features: int, batch_size: int) -> Tuple[np.ndarray, Dict[str, _Side], Dict[str, Dict[str, Any]]]:
+    """Hash and weigh every profile into fresh (idf, sides, profiles)
+
+    Pure CPU work on objects nobody else can see yet, so it runs in a worker
+    thread while the event loop keeps serving the previous index.
+    """
+    hashed: Dict[str, List[Tuple[Dict[str, Any], SparseVector]]] = {user_type: [] for user_type in COUNTERPART}
+    document_frequency = np.zeros(features, dtype=np.int64)
+    for user in users:
+        terms = hash_terms(profile_text(user), features)
+        document_frequency[terms[0]] += 1
+        hashed[user['user_type']].append(({field: user.get(field) for field in DISPLAY_FIELDS}, terms))
+
+    idf = (np.log((1 + len(users)) / (1 + document_frequency)) + 1).astype(np.float32)
+    sides = {user_type: _Side(features) for user_type in COUNTERPART}
+    profiles: Dict[str, Dict[str, Any]] = {}
+    for user_type, entries in hashed.items():
+        for start in range(0, len(entries), batch_size):
+            chunk = entries[start:start + batch_size]
+            sides[user_type].put_many([profile['id'] for profile, _ in chunk], weigh([terms for _, terms in chunk], idf))
+            profiles.update((profile['id'], profile) for profile, _ in chunk)
+    return idf, sides, profiles
+
+class MatchIndex:
+    """Cosine similarity between investor and founder profiles
+
+    Profiles (company plus additional_info) are hashed into `features`
+    buckets, weighted by IDF and L2-normalized into sparse rows per user
+    type. A query scores every row on the other side in one vectorized
+    pass over their nonzero entries followed by argpartition, so top-k
+    stays in the low milliseconds for tens of thousands of profiles.
+
+    The IDF weights are fixed when the index is loaded; profile changes are
+    applied incrementally with those weights. A background task started
+    with `start()` rebuilds the index every `refresh_interval`, recomputing
+    them and picking up writes made by other workers; requests keep using
+    the previous index until the rebuilt one is swapped in.
+    """
+
+    def __init__(self, features: int = MATCH_FEATURES, refresh_interval: float = MATCH_REFRESH_INTERVAL):
+        self.features = features
+        self.refresh_interval = refresh_interval
+        self.idf = np.ones(features, dtype=np.float32)
+        self.sides = {user_type: _Side(features) for user_type in COUNTERPART}
+        self.profiles: Dict[str, Dict[str, Any]] = {}
+        self._reloader = Reloader("Match index rebuild", refresh_interval)
+        # Profiles upserted while a rebuild is reading, re-applied after the swap
+        self._pending: Optional[Dict[str, Dict[str, Any]]] = None
+
+    async def load(self, collection, batch_size: int = MATCH_BUILD_BATCH_SIZE, max_age: Optional[float] = None):
+        """Rebuild the index from every investor and founder profile"""
+        await self._reloader.run(lambda: self._build(collection, batch_size), max_age)
+
+    async def _build(self, collection, batch_size: int = MATCH_BUILD_BATCH_SIZE):
+        """Read profiles on the event loop; hash, count and weigh them in a worker thread"""
+        started = time.perf_counter()
+        self._pending = {}
+        try:
+            cursor = collection.find({"user_type": {"$in": list(COUNTERPART)}}, MATCH_PROJECTION).batch_size(batch_size)
+            users = [user async for user in cursor]
+            self.idf, self.sides, self.profiles = await asyncio.to_thread(build_index, users, self.features, batch_size)
+            pending = self._pending
+        finally:
+            self._pending = None
+        for user in pending.values():
+            self.upsert(user)
+        logger.info(f"Built match index over {len(users)} profiles in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+    async def ensure_loaded(self, collection):
+        """Build the index for the first match request if startup did not"""
+        await self._reloader.ensure(lambda: self._build(collection))
+
+    def start(self, collection):
+        """Rebuild every `refresh_interval` so IDF weights and other workers' writes catch up"""
+        self._reloader.start(lambda: self._build(collection))
+
+    async def stop(self):
+        await self._reloader.stop()
+
+    def upsert(self, user: Dict[str, Any]):
+        """Re-index one profile after it changed; users without a side are dropped"""
+        if self._pending is not None:
+            self._pending[user['id']] = user
+        user_id = user['id']
+        for side in self.sides.values():
+            side.remove(user_id)
+        self.profiles.pop(user_id, None)
+
+        user_type = user.get('user_type')
+        if user_type not in self.sides:
+            return
+        self.sides[user_type].put(user_id, weigh([hash_terms(profile_text(user), self.features)], self.idf))
+        self.profiles[user_id] = {field: user.get(field) for field in DISPLAY_FIELDS}
+
+    def top_k(self, user_id: str, user_type: str, k: int) -> List[Dict[str, Any]]:
+        """The k most similar profiles on the other side, best first"""
+        own = self.sides.get(user_type)
+        query = own.vector(user_id) if own else None
+        if query is None or not query.any():
+            return []
+
+        side = self.sides[COUNTERPART[user_type]]
+        scores = side.scores(query)
+        scores[~side.active[:side.size]] = -np.inf
+        k = min(k, side.size)
+        if k == 0:
+            return []
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [
+            {"user": self.profiles[side.user_ids[row]], "score": round(float(scores[row]), 4)}
+            for row in best if scores[row] > 0
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        return {user_type: len(side.rows) for user_type, side in self.sides.items()}
+
+# Global match index
+match_index = MatchIndex()
@@ -0,0 +1,201 @@
+"""
+Prometheus-format metrics: HTTP middleware, Mongo command timing and auth timings
+"""
+import bisect
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from pymongo import monitoring
+
+# Default latency buckets in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Metric:
+    """Base for labelled metrics; every update takes a short lock"""
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], Any] = {}
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.label_names, labels)} {value}" for labels, value in items]
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str):
+        with self._lock:
+            self._values[labels] = value
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(labels, (list(counts), total, count)) for labels, (counts, total, count) in self._values.items()]
+        lines = self.header()
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {count}")
+        return lines
+
+# A collector returns (name, type, help, labels, value) samples computed at scrape time
+Sample = Tuple[str, str, str, Dict[str, str], float]
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+        self.collectors: List[Callable[[], Iterable[Sample]]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], Iterable[Sample]]):
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+
+        seen = set()
+        for collector in self.collectors:
+            for name, kind, documentation, labels, value in collector():
+                if name not in seen:
+                    seen.add(name)
+                    lines.append(f"# HELP {name} {documentation}")
+                    lines.append(f"# TYPE {name} {kind}")
+                lines.append(f"{name}{_format_labels(tuple(labels), tuple(labels.values()))} {value}")
+        return "\n".join(lines) + "\n"
+
+# Global metrics registry
+registry = MetricsRegistry()
+
+HTTP_REQUESTS = registry.register(Counter(
+    "http_requests_total", "HTTP requests by route and status", ("method", "route", "status")))
+HTTP_LATENCY = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route")))
+HTTP_IN_FLIGHT = registry.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served"))
+MONGO_LATENCY = registry.register(Histogram(
+    "mongodb_command_duration_seconds", "MongoDB command latency by collection and command", ("collection", "command")))
+MONGO_FAILURES = registry.register(Counter(
+    "mongodb_command_failures_total", "Failed MongoDB commands by collection and command", ("collection", "command")))
+AUTH_LATENCY = registry.register(Histogram(
+    "auth_operation_duration_seconds", "bcrypt and JWT operation time", ("operation",)))
+AUTH_QUEUE_WAIT = registry.register(Histogram(
+    "auth_hashing_queue_wait_seconds", "Time bcrypt work waited for a hashing pool slot"))
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency, status and in-flight requests per route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            # The router stores the matched route in the scope; unmatched paths share one label
+            route = getattr(scope.get("route"), "path", "unmatched")
+            method = scope.get("method", "")
+            HTTP_LATENCY.observe(time.perf_counter() - started, method, route)
+            HTTP_REQUESTS.inc(method, route, str(status))
+
+class CommandTimingListener(monitoring.CommandListener):
+    """Records per-collection, per-command durations reported by the driver"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[Any, int], Tuple[str, str]] = {}
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        if event.command_name == 'getMore':
+            target = event.command.get('collection')
+        collection = target if isinstance(target, str) else event.database_name
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = (collection, event.command_name)
+
+    def _finish(self, event) -> Optional[Tuple[str, str]]:
+        with self._lock:
+            return self._pending.pop((event.connection_id, event.request_id), None)
+
+    def succeeded(self, event):
+        labels = self._finish(event)
+        if labels:
+            MONGO_LATENCY.observe(event.duration_micros / 1e6, *labels)
+
+    def failed(self, event):
+        labels = self._finish(event)
+        if labels:
+            MONGO_LATENCY.observe(event.duration_micros / 1e6, *labels)
+            MONGO_FAILURES.inc(*labels)
+
+# Global command listener, registered with the Mongo client registry
+command_timing = CommandTimingListener()
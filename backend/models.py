@@ -0,0 +1,90 @@
+"""
+Request and response models shared by the API and the command-line tools
+"""
+import uuid
+from datetime import date, datetime, timezone
+from typing import List, Optional
+from pydantic import BaseModel, Field, EmailStr, field_validator
+from availability import BOOKING_SLOTS
+
+class UserRegister(BaseModel):
+    name: str
+    email: EmailStr
+    password: str
+    user_type: str  # "investor" or "founder"
+    company: Optional[str] = None
+    additional_info: Optional[str] = None
+
+class UserLogin(BaseModel):
+    email: EmailStr
+    password: str
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+class UserUpdate(BaseModel):
+    name: Optional[str] = None
+    company: Optional[str] = None
+    additional_info: Optional[str] = None
+    user_type: Optional[str] = None
+
+class User(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    name: str
+    email: EmailStr
+    user_type: str
+    company: Optional[str] = None
+    additional_info: Optional[str] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    is_active: bool = True
+    version: int = 0  # bumped on every profile write; feeds the profile ETag
+
+class BookingCreate(BaseModel):
+    name: str
+    email: EmailStr
+    date: str  # ISO date, stored as YYYY-MM-DD
+    time: str  # one of BOOKING_SLOTS, e.g. "10:00"
+    message: Optional[str] = None
+
+    # The unique (date, time) index only prevents double bookings if every
+    # slot has exactly one spelling, so both fields are normalized here
+    @field_validator('date')
+    @classmethod
+    def normalize_date(cls, value: str) -> str:
+        try:
+            return date.fromisoformat(value.strip()).isoformat()
+        except ValueError:
+            raise ValueError("date must be an ISO date (YYYY-MM-DD)")
+
+    @field_validator('time')
+    @classmethod
+    def check_slot(cls, value: str) -> str:
+        value = value.strip()
+        if value not in BOOKING_SLOTS:
+            raise ValueError(f"time must be one of the booking slots: {', '.join(BOOKING_SLOTS)}")
+        return value
+
+class Booking(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    name: str
+    email: EmailStr
+    date: str
+    time: str
+    message: Optional[str] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+class BookingBatchItemResult(BaseModel):
+    index: int
+    status: str  # "created", "invalid" or "failed"
+    id: Optional[str] = None
+    error: Optional[str] = None
+
+class BookingBatchResult(BaseModel):
+    created: int
+    failed: int
+    results: List[BookingBatchItemResult]
+
+class EmailSubscription(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    email: EmailStr
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -0,0 +1,103 @@
+"""
+Typed conversion between API models and Mongo documents
+
+Datetimes are stored as native BSON dates and read back as timezone-aware UTC
+values through CODEC_OPTIONS, so documents need no per-field conversion on
+either path. `from_mongo` only exists for documents written before the
+migration, which stored ISO strings.
+"""
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional, Type
+from bson.codec_options import CodecOptions
+from pydantic import BaseModel
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+# Fields that hold datetimes in any collection
+DATETIME_FIELDS = ('created_at', 'updated_at')
+
+# Decode BSON dates as aware UTC datetimes
+CODEC_OPTIONS = CodecOptions(tz_aware=True, tzinfo=timezone.utc)
+
+def public_projection(model: Type[BaseModel]) -> Dict[str, int]:
+    """Projection fetching exactly a model's fields, and never _id or secrets"""
+    projection = {"_id": 0}
+    projection.update({name: 1 for name in model.model_fields})
+    return projection
+
+def to_mongo(model: BaseModel) -> Dict[str, Any]:
+    """Turn a model into a document, keeping datetimes native"""
+    data = model.dict()
+    for field in DATETIME_FIELDS:
+        value = data.get(field)
+        if isinstance(value, datetime) and value.tzinfo is None:
+            data[field] = value.replace(tzinfo=timezone.utc)
+    return data
+
+def from_mongo(document: Dict[str, Any]) -> Dict[str, Any]:
+    """Parse legacy ISO-string datetimes in a document that has not been migrated yet"""
+    for field in DATETIME_FIELDS:
+        value = document.get(field)
+        if isinstance(value, str):
+            try:
+                document[field] = datetime.fromisoformat(value)
+            except ValueError:
+                pass
+    return document
+
+def json_default(value: Any) -> Any:
+    """json.dumps fallback matching the API's datetime format"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+async def migrate_datetimes(db, collections: Iterable[str], batch_size: int = 1000,
+                            fields: Iterable[str] = DATETIME_FIELDS) -> Dict[str, int]:
+    """Convert ISO-string datetimes to BSON dates in place, in batches ordered by _id
+
+    Converted documents no longer match the string filter, so an interrupted run
+    simply resumes from the next unconverted document. Each update only applies
+    if the field still holds the string that was read.
+    """
+    fields = list(fields)
+    converted: Dict[str, int] = {}
+    for name in collections:
+        collection = db[name]
+        query: Dict[str, Any] = {"$or": [{field: {"$type": "string"}} for field in fields]}
+        last_id: Optional[Any] = None
+        converted[name] = 0
+        while True:
+            batch_query = dict(query)
+            if last_id is not None:
+                batch_query["_id"] = {"$gt": last_id}
+            documents = await collection.find(
+                batch_query, {field: 1 for field in fields}
+            ).sort("_id", 1).limit(batch_size).to_list(batch_size)
+            if not documents:
+                break
+
+            operations = []
+            for document in documents:
+                updates, expected = {}, {"_id": document["_id"]}
+                for field in fields:
+                    value = document.get(field)
+                    if not isinstance(value, str):
+                        continue
+                    try:
+                        parsed = datetime.fromisoformat(value)
+                    except ValueError:
+                        logger.warning(f"Skipping unparseable {name}.{field} on {document['_id']}: {value!r}")
+                        continue
+                    updates[field] = parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+                    expected[field] = value
+                if updates:
+                    operations.append(UpdateOne(expected, {"$set": updates}))
+
+            if operations:
+                result = await collection.bulk_write(operations, ordered=False)
+                converted[name] += result.modified_count
+            last_id = documents[-1]["_id"]
+            logger.info(f"Migrated {converted[name]} {name} documents so far")
+    return converted
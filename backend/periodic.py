@@ -0,0 +1,86 @@
+"""
+Background tasks that repeat on an interval
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+class PeriodicTask:
+    """Awaits `action` every `interval` seconds until stopped
+
+    The first run happens one interval after `start()`, or right away with
+    `run_first`. An exception from `action` is logged under `name` and the
+    loop carries on with the next interval.
+    """
+
+    def __init__(self, name: str, action: Callable[[], Awaitable[Any]], interval: float, run_first: bool = False):
+        self.name = name
+        self.action = action
+        self.interval = interval
+        self.run_first = run_first
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        if not self.run_first:
+            await asyncio.sleep(self.interval)
+        while True:
+            try:
+                await self.action()
+            except Exception as e:
+                logger.error(f"{self.name} failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+class Reloader:
+    """Serializes rebuilds of an in-memory snapshot and repeats them in the background
+
+    Callers pass the coroutine function that rebuilds the snapshot. With
+    `max_age`, a rebuild that finished within that many seconds (typically
+    by a caller that held the lock first) is reused instead of repeated.
+    """
+
+    def __init__(self, name: str, interval: float):
+        self.name = name
+        self.interval = interval
+        self.loaded_at: Optional[float] = None  # monotonic
+        self._lock = asyncio.Lock()
+        self._task: Optional[PeriodicTask] = None
+
+    async def run(self, load: Callable[[], Awaitable[Any]], max_age: Optional[float] = None) -> bool:
+        """Rebuild unless a fresh enough one exists; return whether `load` ran"""
+        async with self._lock:
+            if max_age is not None and self.loaded_at is not None and time.monotonic() - self.loaded_at <= max_age:
+                return False
+            await load()
+            self.loaded_at = time.monotonic()
+            return True
+
+    async def ensure(self, load: Callable[[], Awaitable[Any]]):
+        """Build once if nothing was ever built; later refreshes are the background task's job"""
+        if self.loaded_at is None:
+            await self.run(load, max_age=self.interval)
+
+    def start(self, load: Callable[[], Awaitable[Any]]):
+        if self._task is None:
+            self._task = PeriodicTask(self.name, lambda: self.run(load, max_age=self.interval), self.interval)
+            self._task.start()
+
+    async def stop(self):
+        if self._task is not None:
+            await self._task.stop()
+            self._task = None
@@ -0,0 +1,122 @@
+"""
+Explain-plan auditor that catches queries falling back to collection scans
+
+tests/test_query_audit.py drives every API route through it against mongod.
+"""
+import json
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+# Commands that carry a query the planner can answer from an index
+AUDITED_COMMANDS = {'find', 'count', 'distinct', 'aggregate', 'update', 'delete', 'findAndModify'}
+
+# Driver and session fields that must not be passed back into explain
+IGNORED_FIELDS = {'lsid', '$db', '$clusterTime', 'txnNumber', '$readPreference', 'readConcern', 'writeConcern', 'cursor'}
+
+class QueryAuditError(AssertionError):
+    """Raised when an audited query is planned as a collection scan"""
+
+def _shape(value: Any) -> Any:
+    """Replace literal values with their type so queries differing only in values share a shape"""
+    if isinstance(value, dict):
+        return {key: _shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_shape(item) for item in value]
+    return type(value).__name__
+
+def _has_query(command_name: str, command: Dict[str, Any]) -> bool:
+    """An unfiltered, unsorted read is a deliberate full scan and is not audited"""
+    if command_name == 'find':
+        return bool(command.get('filter') or command.get('sort'))
+    if command_name in ('count', 'distinct', 'findAndModify'):
+        return bool(command.get('query') or command.get('sort'))
+    if command_name == 'aggregate':
+        pipeline = command.get('pipeline') or []
+        return bool(pipeline) and bool(pipeline[0].get('$match') or pipeline[0].get('$sort'))
+    if command_name == 'update':
+        return any(statement.get('q') for statement in command.get('updates', []))
+    if command_name == 'delete':
+        return any(statement.get('q') for statement in command.get('deletes', []))
+    return False
+
+def find_collscans(plan: Any) -> List[Dict[str, Any]]:
+    """Collect every COLLSCAN stage in an explain document, ignoring rejected plans"""
+    found = []
+    if isinstance(plan, dict):
+        if plan.get('stage') == 'COLLSCAN':
+            found.append(plan)
+        for key, value in plan.items():
+            if key != 'rejectedPlans':
+                found.extend(find_collscans(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            found.extend(find_collscans(item))
+    return found
+
+class QueryAuditor(monitoring.CommandListener):
+    """Records one representative command per query shape for later explain()
+
+    Register it with the client registry before the client is created, drive the
+    API, then call `assert_no_collscans(client)`.
+    """
+
+    def __init__(self, allowed_collections: Optional[Set[str]] = None):
+        self.allowed_collections = allowed_collections or set()
+        self._lock = threading.Lock()
+        self.queries: Dict[Tuple[str, str, str, str], Dict[str, Any]] = {}
+
+    def started(self, event):
+        if event.command_name not in AUDITED_COMMANDS:
+            return
+        command = dict(event.command)
+        collection = command.get(event.command_name)
+        if collection in self.allowed_collections or not _has_query(event.command_name, command):
+            return
+
+        clean = {key: value for key, value in command.items() if key not in IGNORED_FIELDS}
+        shape = json.dumps(_shape({key: value for key, value in clean.items() if key != event.command_name}), sort_keys=True, default=str)
+        key = (event.database_name, event.command_name, str(collection), shape)
+        with self._lock:
+            self.queries.setdefault(key, clean)
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+    def reset(self):
+        with self._lock:
+            self.queries.clear()
+
+    async def audit(self, client) -> List[Dict[str, Any]]:
+        """Explain every recorded query shape and return the ones that scan a collection"""
+        with self._lock:
+            queries = list(self.queries.items())
+
+        findings = []
+        for (database_name, command_name, collection, _), command in queries:
+            explain = await client[database_name].command({'explain': command, 'verbosity': 'queryPlanner'})
+            if find_collscans(explain):
+                findings.append({
+                    'database': database_name,
+                    'collection': collection,
+                    'command': command_name,
+                    'query': command,
+                })
+        return findings
+
+    async def assert_no_collscans(self, client):
+        """Raise QueryAuditError listing every query that fell back to COLLSCAN"""
+        findings = await self.audit(client)
+        if findings:
+            lines = [
+                f"{finding['collection']}.{finding['command']}: {json.dumps(finding['query'], default=str)}"
+                for finding in findings
+            ]
+            raise QueryAuditError("Queries planned as COLLSCAN:\n" + "\n".join(lines))
+        logger.info(f"Query audit passed for {len(self.queries)} query shapes")
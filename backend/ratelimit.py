@@ -0,0 +1,146 @@
+"""
+Admission control and per-client rate limiting for CPU-heavy auth endpoints
+"""
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+from fastapi import HTTPException
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory')  # "memory" or "mongo"
+AUTH_RATE_LIMIT_WINDOW = int(os.environ.get('AUTH_RATE_LIMIT_WINDOW', '60'))
+AUTH_RATE_LIMIT_PER_IP = int(os.environ.get('AUTH_RATE_LIMIT_PER_IP', '30'))
+AUTH_RATE_LIMIT_PER_EMAIL = int(os.environ.get('AUTH_RATE_LIMIT_PER_EMAIL', '10'))
+AUTH_MAX_HASHING_QUEUE = int(os.environ.get('AUTH_MAX_HASHING_QUEUE', '64'))
+
+class InMemoryLimiterStore:
+    """Per-process window counters
+
+    Only the current and previous window are kept, per window length, so
+    expired counters are dropped in O(1) by shifting the windows when a new
+    one starts. The current window holds at most `max_keys` keys; beyond
+    that the key first seen longest ago is forgotten, which keeps every hit
+    O(1) even when a credential-stuffing run sprays distinct emails.
+    """
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        # window length -> (current window start, current counts, previous counts)
+        self._windows: Dict[int, Tuple[int, "OrderedDict[str, int]", Dict[str, int]]] = {}
+
+    async def hit(self, key: str, window_start: int, window: int) -> Tuple[int, int]:
+        """Count a hit in the current window; return (current, previous) window counts"""
+        start, current, previous = self._windows.get(window, (window_start, OrderedDict(), {}))
+        if window_start > start:
+            previous = current if window_start - start == window else {}
+            start, current = window_start, OrderedDict()
+        self._windows[window] = (start, current, previous)
+
+        count = current.get(key, 0) + 1
+        if count == 1 and len(current) >= self.max_keys:
+            current.popitem(last=False)
+        current[key] = count
+        return count, previous.get(key, 0)
+
+class MongoLimiterStore:
+    """Window counters shared by every worker, expired by a TTL index on expires_at"""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def hit(self, key: str, window_start: int, window: int) -> Tuple[int, int]:
+        expires_at = datetime.fromtimestamp(window_start + 2 * window, tz=timezone.utc)
+        current, previous = await asyncio.gather(
+            self.collection.find_one_and_update(
+                {"_id": f"{key}:{window_start}"},
+                {"$inc": {"count": 1}, "$setOnInsert": {"expires_at": expires_at}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            ),
+            self.collection.find_one({"_id": f"{key}:{window_start - window}"})
+        )
+        return current['count'], (previous or {}).get('count', 0)
+
+class SlidingWindowLimiter:
+    """Approximate sliding window: the previous window's count is weighted by its overlap"""
+
+    def __init__(self, store, limit: int, window: int = AUTH_RATE_LIMIT_WINDOW):
+        self.store = store
+        self.limit = limit
+        self.window = window
+
+    async def check(self, key: str) -> float:
+        """Record a hit; return 0 if allowed, otherwise seconds until retrying makes sense"""
+        now = time.time()
+        window_start = int(now // self.window) * self.window
+        current, previous = await self.store.hit(key, window_start, self.window)
+        elapsed = now - window_start
+        estimated = previous * (1 - elapsed / self.window) + current
+        if estimated <= self.limit:
+            return 0.0
+        return self.window - elapsed
+
+class AdmissionController:
+    """Sheds auth requests before they reach bcrypt
+
+    Requests are refused with 503 while the hashing pool already has
+    `max_hashing_queue` jobs waiting, and with 429 once a client IP or an
+    email address exceeds its sliding-window limit.
+    """
+
+    def __init__(self, store, hashing_executor,
+                 ip_limit: int = AUTH_RATE_LIMIT_PER_IP,
+                 email_limit: int = AUTH_RATE_LIMIT_PER_EMAIL,
+                 window: int = AUTH_RATE_LIMIT_WINDOW,
+                 max_hashing_queue: int = AUTH_MAX_HASHING_QUEUE):
+        self.hashing_executor = hashing_executor
+        self.ip_limiter = SlidingWindowLimiter(store, ip_limit, window)
+        self.email_limiter = SlidingWindowLimiter(store, email_limit, window)
+        self.max_hashing_queue = max_hashing_queue
+        self.rejected = {'overloaded': 0, 'ip': 0, 'email': 0}
+
+    async def admit(self, action: str, client_ip: Optional[str], email: Optional[str]):
+        """Raise HTTPException(503/429) with Retry-After if the request must be refused"""
+        if self.hashing_executor.waiting >= self.max_hashing_queue:
+            self.rejected['overloaded'] += 1
+            raise HTTPException(status_code=503, detail="Server busy, please retry", headers={"Retry-After": "1"})
+
+        checks = []
+        if client_ip:
+            checks.append(('ip', self.ip_limiter.check(f"{action}:ip:{client_ip}")))
+        if email:
+            checks.append(('email', self.email_limiter.check(f"{action}:email:{email.lower()}")))
+        if not checks:
+            return
+
+        try:
+            waits = await asyncio.gather(*(check for _, check in checks))
+        except Exception as e:
+            # Never lock users out because the limiter store is unavailable
+            logger.error(f"Rate limiter store error: {e}")
+            return
+
+        for (scope, _), retry_after in zip(checks, waits):
+            if retry_after > 0:
+                self.rejected[scope] += 1
+                raise HTTPException(
+                    status_code=429,
+                    detail="Too many attempts, please retry later",
+                    headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+                )
+
+def create_limiter_store(db, backend: str = RATE_LIMIT_BACKEND):
+    """Build the configured limiter store"""
+    if backend == 'mongo':
+        return MongoLimiterStore(db.rate_limits)
+    if backend != 'memory':
+        raise ValueError(f"Unknown rate limit backend: {backend}")
+    return InMemoryLimiterStore()
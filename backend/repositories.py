@@ -0,0 +1,171 @@
+"""
+Data access for users, bookings, subscriptions, refresh tokens and change counters
+
+Every operation is a single round trip: writes that need the result use
+find_one_and_update/find_one_and_delete, inserts rely on unique indexes and
+DuplicateKeyError instead of a prior lookup, and subscriptions are upserts.
+"""
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY_ERROR = 11000
+
+class AlreadyExists(Exception):
+    """A unique index rejected the write"""
+
+class UserRepository:
+    def __init__(self, collection, projection: Dict[str, int]):
+        self.collection = collection
+        self.projection = projection
+
+    async def get_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
+        return await self.collection.find_one({"id": user_id}, self.projection)
+
+    async def get_for_login(self, email: str) -> Optional[Dict[str, Any]]:
+        """Public fields plus the password hash"""
+        return await self.collection.find_one({"email": email}, {**self.projection, "password_hash": 1})
+
+    async def create(self, document: Dict[str, Any]):
+        """Insert a user; raises AlreadyExists when the email is taken"""
+        try:
+            await self.collection.insert_one(document)
+        except DuplicateKeyError:
+            raise AlreadyExists("Email already registered")
+
+    async def update(self, user_id: str, fields: Dict[str, Any]) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """Apply a $set and bump the version; return (previous, updated) public documents, or None if missing
+
+        The previous document is the write's own before-image, so callers
+        see the values this write replaced even when another worker changed
+        them after the caller last read the user. The updated document is
+        derived from it, since $set and $inc fully determine the result.
+        """
+        previous = await self.collection.find_one_and_update(
+            {"id": user_id},
+            {"$set": fields, "$inc": {"version": 1}},
+            projection=self.projection,
+            return_document=ReturnDocument.BEFORE
+        )
+        if previous is None:
+            return None
+        return previous, {**previous, **fields, "version": previous.get("version", 0) + 1}
+
+class ChangeCounters:
+    """Per-collection version numbers, bumped on every write to that collection
+
+    Lists use them as cheap validators: one find_one by _id tells whether
+    anything changed since a client last fetched.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def bump(self, name: str):
+        """Advance the version of `name`
+
+        Failures are logged rather than raised: the write being counted has
+        already succeeded, and a missed bump only delays clients noticing it
+        until the next successful one.
+        """
+        try:
+            await self.collection.update_one({"_id": name}, {"$inc": {"version": 1}}, upsert=True)
+        except Exception as e:
+            logger.error(f"Change counter bump failed for {name}: {e}")
+
+    async def current(self, name: str) -> int:
+        document = await self.collection.find_one({"_id": name})
+        return document['version'] if document else 0
+
+class BookingRepository:
+    def __init__(self, collection, projection: Dict[str, int], counters: ChangeCounters):
+        self.collection = collection
+        self.projection = projection
+        self.counters = counters
+
+    async def create(self, document: Dict[str, Any]):
+        """Insert a booking; raises AlreadyExists when the slot is taken
+
+        Callers follow successful inserts with `record_change()`, so the
+        counter bump can run concurrently with their other follow-up writes.
+        """
+        try:
+            await self.collection.insert_one(document)
+        except DuplicateKeyError:
+            raise AlreadyExists("Time slot already booked")
+
+    async def create_many(self, documents: List[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+        """Unordered insert_many; returns write errors keyed by position in `documents`"""
+        errors = {}
+        try:
+            await self.collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            errors = {error['index']: error for error in e.details.get('writeErrors', [])}
+        return errors
+
+    async def record_change(self):
+        """Bump the bookings change counter after a successful insert; never raises"""
+        await self.counters.bump(self.collection.name)
+
+    async def version(self) -> int:
+        """Change counter for the whole collection"""
+        return await self.counters.current(self.collection.name)
+
+    def find(self, date_from: Optional[str] = None, date_to: Optional[str] = None,
+             after: Optional[Tuple[datetime, str]] = None):
+        """Cursor over bookings in (created_at, id) order, starting after a keyset position"""
+        query: Dict[str, Any] = {}
+        if date_from or date_to:
+            query['date'] = {}
+            if date_from:
+                query['date']['$gte'] = date_from
+            if date_to:
+                query['date']['$lte'] = date_to
+        if after:
+            created_at, booking_id = after
+            query['$or'] = [
+                {"created_at": {"$gt": created_at}},
+                {"created_at": created_at, "id": {"$gt": booking_id}}
+            ]
+        return self.collection.find(query, self.projection).sort([("created_at", 1), ("id", 1)])
+
+class SubscriptionRepository:
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def upsert_many(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Insert subscriptions whose email is new, in one unordered bulk write
+
+        Returns the documents actually inserted. Duplicate key errors from
+        concurrent upserts of the same address are expected and ignored.
+        """
+        operations = [
+            UpdateOne({"email": document["email"]}, {"$setOnInsert": document}, upsert=True)
+            for document in documents
+        ]
+        try:
+            result = await self.collection.bulk_write(operations, ordered=False)
+            return [documents[index] for index in result.upserted_ids]
+        except BulkWriteError as e:
+            errors = [error for error in e.details.get('writeErrors', []) if error.get('code') != DUPLICATE_KEY_ERROR]
+            if errors:
+                raise
+            return [documents[upserted['index']] for upserted in e.details.get('upserted', [])]
+
+class RefreshTokenRepository:
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def create(self, document: Dict[str, Any]):
+        await self.collection.insert_one(document)
+
+    async def consume(self, token_hash: str, now: datetime) -> Optional[Dict[str, Any]]:
+        """Atomically take an unexpired token so it can only be used once"""
+        return await self.collection.find_one_and_delete({"token_hash": token_hash, "expires_at": {"$gt": now}})
+
+    async def revoke(self, token_hash: str):
+        await self.collection.delete_one({"token_hash": token_hash})
@@ -0,0 +1,188 @@
+"""
+Pre-aggregated dashboard counters for signups, bookings and subscriptions
+
+Each rollup document holds the counts for one metric on one day:
+    {"_id": "signups:2024-05-01", "metric": "signups", "day": "2024-05-01",
+     "total": 7, "counts": {"investor": 3, "founder": 4}}
+Write paths add to them with $inc upserts, so dashboards read a handful of
+small documents instead of aggregating the source collections.
+
+Usage: python rollups.py backfill
+"""
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Iterable, List, Tuple
+from pymongo import ReplaceOne, UpdateOne
+from mongo_codec import from_mongo
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+STATS_MAX_DAYS = int(os.environ.get('STATS_MAX_DAYS', '366'))
+ROLLUP_BACKFILL_BATCH_SIZE = int(os.environ.get('ROLLUP_BACKFILL_BATCH_SIZE', '5000'))
+
+ROLLUP_COLLECTION = "stats_rollups"
+
+SIGNUPS = "signups"          # per signup day, counted by user_type
+BOOKINGS = "bookings"        # per booked date, counted by time slot
+SUBSCRIPTIONS = "subscriptions"  # per subscription day
+METRICS = (SIGNUPS, BOOKINGS, SUBSCRIPTIONS)
+
+# (metric, day) -> {counter key: amount}
+Increments = Dict[Tuple[str, str], Dict[str, int]]
+
+def _day(value: Any) -> str:
+    """UTC calendar day of a datetime (naive values are taken as UTC) or date string"""
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        return value.date().isoformat()
+    return str(value)[:10]
+
+def _key(value: Any) -> str:
+    """Counter names become field paths, so they cannot contain dots or start with $"""
+    return str(value or "unknown").replace(".", "_").lstrip("$") or "unknown"
+
+class StatsRollups:
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def apply(self, increments: Increments):
+        """Add `increments` with one unordered bulk upsert
+
+        Failures are logged rather than raised: the source write has already
+        succeeded, and a backfill restores exact counts.
+        """
+        operations = []
+        for (metric, day), counts in increments.items():
+            counts = {key: amount for key, amount in counts.items() if amount}
+            if not counts:
+                continue
+            operations.append(UpdateOne(
+                {"_id": f"{metric}:{day}"},
+                {
+                    "$inc": {"total": sum(counts.values()), **{f"counts.{key}": amount for key, amount in counts.items()}},
+                    "$setOnInsert": {"metric": metric, "day": day}
+                },
+                upsert=True
+            ))
+        if not operations:
+            return
+        try:
+            await self.collection.bulk_write(operations, ordered=False)
+        except Exception as e:
+            logger.error(f"Rollup update failed for {len(operations)} counters: {e}")
+
+    async def record_signup(self, user_type: str, created_at: datetime):
+        await self.apply({(SIGNUPS, _day(created_at)): {_key(user_type): 1}})
+
+    async def record_signups(self, documents: Iterable[Dict[str, Any]]):
+        """Count a batch of new user documents, e.g. from a bulk import"""
+        increments: Increments = defaultdict(lambda: defaultdict(int))
+        for document in documents:
+            increments[(SIGNUPS, _day(document['created_at']))][_key(document['user_type'])] += 1
+        await self.apply(increments)
+
+    async def record_user_type_change(self, old_type: str, new_type: str, created_at: datetime):
+        """Move a signup between user_type counters, e.g. when a pending user picks a side"""
+        if _key(old_type) == _key(new_type):
+            return
+        await self.apply({(SIGNUPS, _day(created_at)): {_key(old_type): -1, _key(new_type): 1}})
+
+    async def record_bookings(self, documents: Iterable[Dict[str, Any]]):
+        increments: Increments = defaultdict(lambda: defaultdict(int))
+        for document in documents:
+            increments[(BOOKINGS, _day(document['date']))][_key(document['time'])] += 1
+        await self.apply(increments)
+
+    async def record_subscriptions(self, documents: Iterable[Dict[str, Any]]):
+        increments: Increments = defaultdict(lambda: defaultdict(int))
+        for document in documents:
+            increments[(SUBSCRIPTIONS, _day(document['created_at']))]["new"] += 1
+        await self.apply(increments)
+
+    async def read(self, metric: str, day_from: date, day_to: date) -> List[Dict[str, Any]]:
+        """Rollups for `metric` with day in [day_from, day_to], oldest first"""
+        cursor = self.collection.find(
+            {"metric": metric, "day": {"$gte": day_from.isoformat(), "$lte": day_to.isoformat()}},
+            {"_id": 0, "day": 1, "total": 1, "counts": 1}
+        ).sort("day", 1)
+        return await cursor.to_list(None)
+
+    async def backfill(self, db, batch_size: int = ROLLUP_BACKFILL_BATCH_SIZE) -> Dict[str, int]:
+        """Recompute every rollup from the source collections
+
+        Each collection is read once with a narrow projection and counted in
+        memory (one entry per day, not per document). Rollups are then
+        replaced wholesale and stale days removed. Writes landing while it
+        runs may be counted twice or missed, so run it when traffic is low.
+        """
+        sources = {
+            SIGNUPS: ("users", {"created_at": 1, "user_type": 1},
+                      lambda doc: (_day(doc.get('created_at')), _key(doc.get('user_type')))),
+            BOOKINGS: ("bookings", {"date": 1, "time": 1},
+                       lambda doc: (_day(doc.get('date')), _key(doc.get('time')))),
+            SUBSCRIPTIONS: ("email_subscriptions", {"created_at": 1},
+                            lambda doc: (_day(doc.get('created_at')), "new")),
+        }
+        written = {}
+        for metric, (collection_name, projection, bucket) in sources.items():
+            counts: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+            cursor = db[collection_name].find({}, {"_id": 0, **projection}).batch_size(batch_size)
+            async for document in cursor:
+                day, key = bucket(from_mongo(document))
+                counts[day][key] += 1
+
+            operations = [
+                ReplaceOne(
+                    {"_id": f"{metric}:{day}"},
+                    {"metric": metric, "day": day, "total": sum(day_counts.values()), "counts": dict(day_counts)},
+                    upsert=True
+                )
+                for day, day_counts in counts.items()
+            ]
+            for start in range(0, len(operations), batch_size):
+                await self.collection.bulk_write(operations[start:start + batch_size], ordered=False)
+            await self.collection.delete_many({"metric": metric, "day": {"$nin": list(counts)}})
+            written[metric] = len(operations)
+            logger.info(f"Backfilled {len(operations)} {metric} rollups from {collection_name}")
+        return written
+
+if __name__ == "__main__":
+    import typer
+    from database import registry, close_client
+
+    cli = typer.Typer(help="Analytics rollups")
+
+    @cli.command()
+    def backfill(batch_size: int = typer.Option(ROLLUP_BACKFILL_BATCH_SIZE, help="Documents per cursor batch and bulk write")):
+        """Rebuild stats_rollups from users, bookings and email_subscriptions"""
+        async def main():
+            try:
+                db = registry.get_db()
+                return await StatsRollups(db[ROLLUP_COLLECTION]).backfill(db, batch_size)
+            finally:
+                close_client()
+
+        for metric, count in asyncio.run(main()).items():
+            typer.echo(f"{metric}: {count} days")
+
+    @cli.command()
+    def show(metric: str = typer.Argument(SIGNUPS), days: int = typer.Option(30, help="Days back from today")):
+        """Print recent rollups for one metric"""
+        async def main():
+            try:
+                today = datetime.now(timezone.utc).date()
+                return await StatsRollups(registry.get_db()[ROLLUP_COLLECTION]).read(
+                    metric, date.fromordinal(today.toordinal() - days + 1), today
+                )
+            finally:
+                close_client()
+
+        for rollup in asyncio.run(main()):
+            typer.echo(f"{rollup['day']}  {rollup['total']:>6}  {rollup.get('counts', {})}")
+
+    cli()
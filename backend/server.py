@@ -1,31 +1,83 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Request, Response, Depends
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, APIRouter, HTTPException, Request, Response, Depends, Query
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse, PlainTextResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import asyncio
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, EmailStr
-from typing import List, Optional, Annotated
-import uuid
-from datetime import datetime, timezone, timedelta
+from contextlib import asynccontextmanager
+from pydantic import ValidationError
+from typing import List, Optional, Annotated, Dict, Any
+import json
+import base64
+import orjson
+from datetime import datetime, timezone, timedelta, date
 
 # Import our custom modules
-from database import get_database, init_database
-from auth import AuthManager, PasswordValidator, TokenData
+from database import get_database, init_database, get_client, close_client, registry, health_prober
+from auth import AuthManager, PasswordValidator, TokenData, hashing_executor
+from models import (
+    UserRegister, UserLogin, RefreshRequest, UserUpdate, User, BookingCreate, Booking,
+    BookingBatchItemResult, BookingBatchResult, EmailSubscription
+)
+from cache import principal_cache
+from subscriptions import UpsertBuffer
+from availability import slot_calendar, AVAILABILITY_MAX_DAYS
+from matching import match_index, COUNTERPART, MATCH_MAX_RESULTS
+from ratelimit import AdmissionController, create_limiter_store
+from structured_logging import configure_logging, RequestIdMiddleware
+from static_files import create_static_app, ApiGZipMiddleware
+from metrics import MetricsMiddleware, command_timing, registry as metrics_registry
+from export import EXPORT_FIELDS, EXPORT_FORMATS, ExportUnavailable, export_collection
+from mongo_codec import to_mongo, from_mongo, json_default, public_projection
+from rollups import StatsRollups, ROLLUP_COLLECTION, METRICS, STATS_MAX_DAYS
+from repositories import AlreadyExists, ChangeCounters, UserRepository, BookingRepository, SubscriptionRepository, RefreshTokenRepository
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+# MongoDB connection (one shared, pooled client per process)
+registry.add_listener(command_timing)
+client = get_client()
 db = client[os.environ['DB_NAME']]
 
+# Rate limiting and load shedding in front of bcrypt
+admission = AdmissionController(create_limiter_store(db), hashing_executor)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Initialize database on startup and release shared resources on shutdown"""
+    try:
+        await init_database()
+        health_prober.start()
+        await slot_calendar.load(bookings.collection)
+        slot_calendar.start(bookings.collection)
+        await match_index.load(users.collection)
+        match_index.start(users.collection)
+        subscription_buffer.start()
+        logger.info("Application startup completed")
+    except Exception as e:
+        logger.error(f"Startup failed: {e}")
+        raise
+    
+    yield
+    
+    await subscription_buffer.stop()
+    await match_index.stop()
+    await slot_calendar.stop()
+    await health_prober.stop()
+    hashing_executor.shutdown(wait=False)
+    close_client()
+
+class FastJSONResponse(ORJSONResponse):
+    """orjson-backed response; UTC datetimes render with a Z suffix, as Pydantic does"""
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+
 # Create the main app without a prefix
-app = FastAPI()
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -33,73 +85,91 @@ api_router = APIRouter(prefix="/api")
 # Security
 security = HTTPBearer(auto_error=False)
 
-# Define Models
-class UserRegister(BaseModel):
-    name: str
-    email: EmailStr
-    password: str
-    user_type: str  # "investor" or "founder"
-    company: Optional[str] = None
-    additional_info: Optional[str] = None
-
-class UserLogin(BaseModel):
-    email: EmailStr
-    password: str
-
-class UserUpdate(BaseModel):
-    name: Optional[str] = None
-    company: Optional[str] = None
-    additional_info: Optional[str] = None
-    user_type: Optional[str] = None
-
-class User(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    name: str
-    email: EmailStr
-    user_type: str
-    company: Optional[str] = None
-    additional_info: Optional[str] = None
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    is_active: bool = True
-
-class BookingCreate(BaseModel):
-    name: str
-    email: EmailStr
-    date: str  # ISO date string
-    time: str  # time string like "10:00"
-    message: Optional[str] = None
-
-class Booking(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    name: str
-    email: EmailStr
-    date: str
-    time: str
-    message: Optional[str] = None
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-
-class EmailSubscription(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    email: EmailStr
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+# Pagination
+BOOKINGS_PAGE_SIZE = int(os.environ.get('BOOKINGS_PAGE_SIZE', '100'))
+BOOKINGS_MAX_PAGE_SIZE = int(os.environ.get('BOOKINGS_MAX_PAGE_SIZE', '1000'))
+STREAM_BATCH_SIZE = int(os.environ.get('STREAM_BATCH_SIZE', '500'))
+
+# Batch ingestion
+BOOKING_BATCH_MAX_ITEMS = int(os.environ.get('BOOKING_BATCH_MAX_ITEMS', '5000'))
+BOOKING_BATCH_CHUNK_SIZE = int(os.environ.get('BOOKING_BATCH_CHUNK_SIZE', '500'))
+
+# Admin access
+ADMIN_EMAILS = {email.strip().lower() for email in os.environ.get('ADMIN_EMAILS', '').split(',') if email.strip()}
+
+# Projections fetching only the public fields of each model
+USER_PROJECTION = public_projection(User)
+BOOKING_PROJECTION = public_projection(Booking)
+
+# Repositories: every handler goes through these instead of db.<collection>
+users = UserRepository(db.users, USER_PROJECTION)
+change_counters = ChangeCounters(db.change_counters)
+bookings = BookingRepository(db.bookings, BOOKING_PROJECTION, change_counters)
+subscriptions = SubscriptionRepository(db.email_subscriptions)
+refresh_tokens = RefreshTokenRepository(db.refresh_tokens)
+
+# Dashboard counters maintained on every write path
+rollups = StatsRollups(db[ROLLUP_COLLECTION])
+
+async def write_subscriptions(documents: List[dict]) -> List[dict]:
+    """Upsert a buffered batch of subscriptions and count the new ones"""
+    inserted = await subscriptions.upsert_many(documents)
+    await rollups.record_subscriptions(inserted)
+    return inserted
+
+# Write-behind buffer for email subscriptions
+subscription_buffer = UpsertBuffer(write_subscriptions, "email")
 
 # Helper functions
-def prepare_for_mongo(data):
-    if isinstance(data, dict):
-        for key, value in data.items():
-            if isinstance(value, datetime):
-                data[key] = value.isoformat()
-    return data
-
-def parse_from_mongo(item):
-    if isinstance(item, dict):
-        for key, value in item.items():
-            if key.endswith('_at') and isinstance(value, str):
-                try:
-                    item[key] = datetime.fromisoformat(value)
-                except:
-                    pass
-    return item
+def encode_cursor(doc: dict) -> str:
+    """Build an opaque keyset cursor from the last document of a page"""
+    raw = json.dumps([doc['created_at'], doc['id']], default=json_default)
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor: str) -> tuple:
+    """Decode a keyset cursor into its (created_at, id) position"""
+    try:
+        created_at, item_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return datetime.fromisoformat(created_at), item_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+# Conditional requests
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether If-None-Match lists `etag` (weak comparison, as RFC 9110 requires for GET)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    return "*" in candidates or etag in (candidate.removeprefix("W/") for candidate in candidates)
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+
+# Principal resolution
+def get_token_data(token: str) -> Optional[TokenData]:
+    """Decode a bearer token, reusing cached claims when available"""
+    token_data = principal_cache.get_claims(token)
+    if token_data is None:
+        token_data = AuthManager.verify_token(token)
+        if token_data:
+            principal_cache.set_claims(token, token_data, token_data.expires_at)
+    return token_data
+
+async def get_principal(user_id: str) -> Optional[User]:
+    """Load the user behind a token, serving repeat requests from the principal cache"""
+    user = principal_cache.get_user(user_id)
+    if user is not None:
+        return user
+    
+    # Get user from database; stored documents are trusted, so skip validation
+    user_doc = await users.get_by_id(user_id)
+    if not user_doc:
+        return None
+    
+    user = User.model_construct(**from_mongo(user_doc))
+    principal_cache.refresh_user(user)
+    return user
 
 # Authentication dependency
 async def get_current_user(credentials: Annotated[HTTPAuthorizationCredentials, Depends(security)]) -> User:
@@ -107,16 +177,15 @@ async def get_current_user(credentials: Annotated[HTTPAuthorizationCredentials,
     if not credentials:
         raise HTTPException(status_code=401, detail="Authentication required")
     
-    token_data = AuthManager.verify_token(credentials.credentials)
+    token_data = get_token_data(credentials.credentials)
     if not token_data:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
     
-    # Get user from database
-    user_doc = await db.users.find_one({"id": token_data.user_id})
-    if not user_doc:
+    user = await get_principal(token_data.user_id)
+    if user is None:
         raise HTTPException(status_code=401, detail="User not found")
     
-    return User(**parse_from_mongo(user_doc))
+    return user
 
 # Optional authentication dependency
 async def get_current_user_optional(credentials: Annotated[HTTPAuthorizationCredentials, Depends(security)] = None) -> Optional[User]:
@@ -124,34 +193,50 @@ async def get_current_user_optional(credentials: Annotated[HTTPAuthorizationCred
     if not credentials:
         return None
     
-    token_data = AuthManager.verify_token(credentials.credentials)
+    token_data = get_token_data(credentials.credentials)
     if not token_data:
         return None
     
-    # Get user from database
-    user_doc = await db.users.find_one({"id": token_data.user_id})
-    if not user_doc:
-        return None
-    
-    return User(**parse_from_mongo(user_doc))
+    return await get_principal(token_data.user_id)
+
+# Admin authorization dependency
+async def get_admin_user(current_user: User = Depends(get_current_user)) -> User:
+    """Require an authenticated user listed in ADMIN_EMAILS"""
+    if current_user.email.lower() not in ADMIN_EMAILS:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return current_user
+
+async def issue_tokens(user_data: dict) -> dict:
+    """Create an access token plus a rotating refresh token stored by hash"""
+    access_token = AuthManager.create_access_token(user_data)
+    refresh_token, refresh_hash = AuthManager.create_refresh_token()
+    now = datetime.now(timezone.utc)
+    await refresh_tokens.create({
+        "token_hash": refresh_hash,
+        "user_id": str(user_data['id']),
+        "created_at": now,
+        "expires_at": now + AuthManager.refresh_token_lifetime()
+    })
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+        "expires_in": int(AuthManager.access_token_lifetime().total_seconds())
+    }
 
 # Authentication endpoints
 @api_router.post("/auth/register")
-async def register_user(user_data: UserRegister):
+async def register_user(user_data: UserRegister, request: Request):
     """Register a new user"""
+    await admission.admit("register", request.client.host if request.client else None, user_data.email)
     try:
         # Validate password
         is_valid, message = PasswordValidator.validate_password(user_data.password)
         if not is_valid:
             raise HTTPException(status_code=400, detail=message)
         
-        # Check if user already exists
-        existing_user = await db.users.find_one({"email": user_data.email})
-        if existing_user:
-            raise HTTPException(status_code=400, detail="Email already registered")
-        
         # Hash password
-        hashed_password = AuthManager.hash_password(user_data.password)
+        hashed_password = await AuthManager.hash_password_async(user_data.password)
         
         # Create new user
         new_user = User(
@@ -163,23 +248,21 @@ async def register_user(user_data: UserRegister):
         )
         
         # Prepare user data for MongoDB
-        user_dict = prepare_for_mongo(new_user.dict())
+        user_dict = to_mongo(new_user)
         user_dict['password_hash'] = hashed_password
         
-        # Insert user
-        await db.users.insert_one(user_dict)
-        
-        # Create access token
-        token = AuthManager.create_access_token(user_dict)
+        # Insert user; the unique email index rejects duplicates
+        try:
+            await users.create(user_dict)
+        except AlreadyExists:
+            raise HTTPException(status_code=400, detail="Email already registered")
+        await rollups.record_signup(new_user.user_type, new_user.created_at)
+        match_index.upsert(user_dict)
         
-        # Remove password hash from response
-        user_dict.pop('password_hash', None)
+        # Create access and refresh tokens
+        tokens = await issue_tokens(user_dict)
         
-        return {
-            "user": User(**parse_from_mongo(user_dict)),
-            "access_token": token,
-            "token_type": "bearer"
-        }
+        return {"user": new_user, **tokens}
         
     except HTTPException:
         raise
@@ -188,33 +271,30 @@ async def register_user(user_data: UserRegister):
         raise HTTPException(status_code=500, detail="Registration failed")
 
 @api_router.post("/auth/login")
-async def login_user(login_data: UserLogin):
+async def login_user(login_data: UserLogin, request: Request):
     """Login user with email and password"""
+    await admission.admit("login", request.client.host if request.client else None, login_data.email)
     try:
         # Find user by email
-        user_doc = await db.users.find_one({"email": login_data.email})
+        user_doc = await users.get_for_login(login_data.email)
         if not user_doc:
             raise HTTPException(status_code=401, detail="Invalid email or password")
         
         # Verify password
-        if not AuthManager.verify_password(login_data.password, user_doc['password_hash']):
+        if not await AuthManager.verify_password_async(login_data.password, user_doc['password_hash']):
             raise HTTPException(status_code=401, detail="Invalid email or password")
         
         # Check if user is active
         if not user_doc.get('is_active', True):
             raise HTTPException(status_code=401, detail="Account is deactivated")
         
-        # Create access token
-        token = AuthManager.create_access_token(user_doc)
+        # Create access and refresh tokens
+        tokens = await issue_tokens(user_doc)
         
         # Remove password hash from response
         user_doc.pop('password_hash', None)
         
-        return {
-            "user": User(**parse_from_mongo(user_doc)),
-            "access_token": token,
-            "token_type": "bearer"
-        }
+        return {"user": User.model_construct(**from_mongo(user_doc)), **tokens}
         
     except HTTPException:
         raise
@@ -222,9 +302,39 @@ async def login_user(login_data: UserLogin):
         logging.error(f"Login error: {e}")
         raise HTTPException(status_code=500, detail="Login failed")
 
+@api_router.post("/auth/refresh")
+async def refresh_access_token(refresh_data: RefreshRequest):
+    """Exchange a refresh token for new tokens without re-entering the password"""
+    # Consuming the stored token is the rotation: each refresh token works once
+    record = await refresh_tokens.consume(
+        AuthManager.hash_refresh_token(refresh_data.refresh_token),
+        datetime.now(timezone.utc)
+    )
+    if not record:
+        raise HTTPException(status_code=401, detail="Invalid or expired refresh token")
+    
+    user = await get_principal(record['user_id'])
+    if user is None or not user.is_active:
+        raise HTTPException(status_code=401, detail="User not found")
+    
+    tokens = await issue_tokens(user.dict())
+    return {"user": user, **tokens}
+
+@api_router.post("/auth/logout")
+async def logout_user(refresh_data: RefreshRequest):
+    """Revoke a refresh token"""
+    await refresh_tokens.revoke(AuthManager.hash_refresh_token(refresh_data.refresh_token))
+    return {"message": "Logged out"}
+
 @api_router.get("/auth/profile")
-async def get_profile(current_user: User = Depends(get_current_user)):
-    """Get current user profile"""
+async def get_profile(request: Request, response: Response, current_user: User = Depends(get_current_user)):
+    """Get current user profile; 304 when If-None-Match carries the current version"""
+    etag = f'"{current_user.id}.{current_user.version}"'
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
     return current_user
 
 @api_router.put("/auth/profile")
@@ -248,17 +358,21 @@ async def update_profile(
         if not update_data:
             raise HTTPException(status_code=400, detail="No data to update")
         
-        # Update user in database
-        await db.users.update_one(
-            {"id": current_user.id},
-            {"$set": update_data}
-        )
-        
-        # Get updated user
-        updated_user_doc = await db.users.find_one({"id": current_user.id})
-        updated_user_doc.pop('password_hash', None)
+        # Update user and read back the result in one round trip
+        result = await users.update(current_user.id, update_data)
+        if not result:
+            raise HTTPException(status_code=404, detail="User not found")
+        previous_user_doc, updated_user_doc = result
+        if 'user_type' in update_data:
+            # The type this write replaced, not the possibly stale cached principal's
+            await rollups.record_user_type_change(
+                previous_user_doc.get('user_type'), update_data['user_type'], previous_user_doc['created_at']
+            )
         
-        return User(**parse_from_mongo(updated_user_doc))
+        updated_user = User.model_construct(**from_mongo(updated_user_doc))
+        principal_cache.refresh_user(updated_user)
+        match_index.upsert(updated_user_doc)
+        return updated_user
         
     except HTTPException:
         raise
@@ -271,30 +385,211 @@ async def update_profile(
 async def register_investor(user_data: UserUpdate, current_user: User = Depends(get_current_user)):
     """Complete investor registration (update existing user)"""
     user_data.user_type = "investor"
+    principal_cache.invalidate_user(current_user.id)
     return await update_profile(user_data, current_user)
 
 @api_router.post("/register/founder", response_model=User)
 async def register_founder(user_data: UserUpdate, current_user: User = Depends(get_current_user)):
     """Complete founder registration (update existing user)"""
     user_data.user_type = "founder"
+    principal_cache.invalidate_user(current_user.id)
     return await update_profile(user_data, current_user)
 
+# Matching endpoints
+@api_router.get("/matches")
+async def get_matches(
+    limit: int = Query(10, ge=1, le=MATCH_MAX_RESULTS),
+    current_user: User = Depends(get_current_user)
+):
+    """Founders most similar to the current investor's profile, or investors for a founder"""
+    if current_user.user_type not in COUNTERPART:
+        raise HTTPException(status_code=400, detail="Complete your investor or founder profile first")
+    
+    await match_index.ensure_loaded(users.collection)
+    # Profiles written by another worker since the last reload
+    if current_user.id not in match_index.profiles:
+        match_index.upsert(current_user.dict())
+    return {"matches": match_index.top_k(current_user.id, current_user.user_type, limit)}
+
 # Booking endpoints
 @api_router.post("/bookings", response_model=Booking)
 async def create_booking(booking: BookingCreate):
     """Create a new call booking"""
     booking_obj = Booking(**booking.dict())
-    booking_dict = prepare_for_mongo(booking_obj.dict())
-    await db.bookings.insert_one(booking_dict)
+    booking_dict = to_mongo(booking_obj)
+    try:
+        await bookings.create(booking_dict)
+    except AlreadyExists:
+        # The unique (date, time) index rejects double bookings atomically
+        slot_calendar.mark_booked(booking_obj.date, booking_obj.time)
+        raise HTTPException(status_code=409, detail="Time slot already booked")
+    slot_calendar.mark_booked(booking_obj.date, booking_obj.time)
+    # The booking is stored; neither follow-up write raises, so run them together
+    await asyncio.gather(bookings.record_change(), rollups.record_bookings([booking_dict]))
     return booking_obj
 
+@api_router.get("/bookings/availability")
+async def get_availability(
+    date_from: date = Query(..., alias="from"),
+    date_to: date = Query(..., alias="to")
+):
+    """Free and booked slots for each day in [from, to]; past days are omitted"""
+    date_from = max(date_from, date.today())
+    if date_to < date_from:
+        return {"slots": list(slot_calendar.slots), "days": []}
+    if (date_to - date_from).days >= AVAILABILITY_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range too large (max {AVAILABILITY_MAX_DAYS} days)")
+    
+    await slot_calendar.ensure_loaded(bookings.collection)
+    return {"slots": list(slot_calendar.slots), "days": slot_calendar.availability(date_from, date_to)}
+
+@api_router.post("/bookings/batch", response_model=BookingBatchResult)
+async def create_bookings_batch(items: List[Dict[str, Any]], admin: User = Depends(get_admin_user)):
+    """Create many bookings in one request (admin endpoint, for partner feeds)
+
+    Every item is validated up front; valid ones are written with unordered
+    insert_many in chunks of BOOKING_BATCH_CHUNK_SIZE, and each item gets its
+    own result so one bad booking does not fail the batch.
+    """
+    if len(items) > BOOKING_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large (max {BOOKING_BATCH_MAX_ITEMS} items)"
+        )
+    
+    results: List[Optional[BookingBatchItemResult]] = [None] * len(items)
+    pending = []  # (index, booking document)
+    for index, item in enumerate(items):
+        try:
+            booking_obj = Booking(**BookingCreate(**item).dict())
+        except ValidationError as e:
+            error = e.errors()[0]
+            location = ".".join(str(part) for part in error['loc'])
+            results[index] = BookingBatchItemResult(
+                index=index, status="invalid", error=f"{location}: {error['msg']}"
+            )
+            continue
+        pending.append((index, to_mongo(booking_obj)))
+    
+    for start in range(0, len(pending), BOOKING_BATCH_CHUNK_SIZE):
+        chunk = pending[start:start + BOOKING_BATCH_CHUNK_SIZE]
+        try:
+            write_errors = await bookings.create_many([doc for _, doc in chunk])
+        except Exception as e:
+            logging.error(f"Batch booking insert error: {e}")
+            write_errors = {position: {'errmsg': "Write failed"} for position in range(len(chunk))}
+        
+        created_docs = []
+        for position, (index, doc) in enumerate(chunk):
+            error = write_errors.get(position)
+            if error is None:
+                created_docs.append(doc)
+                slot_calendar.mark_booked(doc['date'], doc['time'])
+                results[index] = BookingBatchItemResult(index=index, status="created", id=doc['id'])
+            elif error.get('code') == 11000:
+                slot_calendar.mark_booked(doc['date'], doc['time'])
+                results[index] = BookingBatchItemResult(index=index, status="failed", error="Time slot already booked")
+            else:
+                results[index] = BookingBatchItemResult(index=index, status="failed", error=error.get('errmsg', 'Write failed'))
+        if created_docs:
+            await asyncio.gather(bookings.record_change(), rollups.record_bookings(created_docs))
+    
+    created = sum(1 for result in results if result.status == "created")
+    return BookingBatchResult(created=created, failed=len(items) - created, results=results)
+
 @api_router.get("/bookings", response_model=List[Booking])
-async def get_bookings(current_user: User = Depends(get_current_user)):
-    """Get all bookings (admin endpoint)"""
+async def get_bookings(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=BOOKINGS_MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    output_format: str = Query("json", alias="format", pattern="^(json|ndjson)$"),
+    current_user: User = Depends(get_current_user)
+):
+    """Get bookings in creation order (admin endpoint)
+
+    Pages are keyset-paginated on (created_at, id); pass the X-Next-Cursor header
+    of one page as `after` to fetch the next. `format=ndjson` streams every
+    matching booking straight off the cursor instead.
+    
+    Responses carry an ETag from the bookings change counter, so polling
+    clients get 304 without the query running while nothing was booked.
+    """
     # For now, allow any authenticated user to see bookings
     # In production, you might want to restrict this to admin users
-    bookings = await db.bookings.find().to_list(1000)
-    return [Booking(**parse_from_mongo(booking)) for booking in bookings]
+    
+    # Read the counter before the data: a write in between leaves an older tag
+    # on newer data, which only costs the client one extra full response
+    etag = f'"bookings.{await bookings.version()}"'
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    validators = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    
+    cursor = bookings.find(date_from, date_to, decode_cursor(after) if after else None)
+    
+    if output_format == "ndjson":
+        if limit:
+            cursor = cursor.limit(limit)
+        cursor = cursor.batch_size(STREAM_BATCH_SIZE)
+        
+        async def stream_bookings():
+            async for booking in cursor:
+                yield orjson.dumps(from_mongo(booking), option=orjson.OPT_UTC_Z) + b"\n"
+        
+        return StreamingResponse(stream_bookings(), media_type="application/x-ndjson", headers=validators)
+    
+    page_size = limit or BOOKINGS_PAGE_SIZE
+    page = await cursor.limit(page_size + 1).to_list(page_size + 1)
+    headers = dict(validators)
+    if len(page) > page_size:
+        page = page[:page_size]
+        headers["X-Next-Cursor"] = encode_cursor(page[-1])
+    
+    # Projected documents already have the Booking shape; render them directly
+    return FastJSONResponse([from_mongo(booking) for booking in page], headers=headers)
+
+# Admin endpoints
+@api_router.get("/admin/export/{collection}")
+async def export_data(
+    collection: str,
+    output_format: str = Query("csv", alias="format", pattern="^(csv|parquet)$"),
+    admin: User = Depends(get_admin_user)
+):
+    """Stream a whole collection as CSV or Parquet in fixed-size batches"""
+    if collection not in EXPORT_FIELDS:
+        raise HTTPException(status_code=404, detail="Unknown collection")
+    
+    try:
+        chunks = await export_collection(db[collection], collection, output_format)
+    except ExportUnavailable as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    
+    media_type, extension = EXPORT_FORMATS[output_format]
+    filename = f"{collection}-{datetime.now(timezone.utc):%Y%m%d%H%M%S}.{extension}"
+    return StreamingResponse(chunks, media_type=media_type, headers={
+        "Content-Disposition": f'attachment; filename="{filename}"'
+    })
+
+@api_router.get("/admin/stats")
+async def get_stats(
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    admin: User = Depends(get_admin_user)
+):
+    """Daily signups by user type, bookings by slot and new subscriptions, read from the rollups
+
+    Defaults to the last 30 days; bookings are keyed by the booked date.
+    """
+    date_to = date_to or datetime.now(timezone.utc).date()
+    date_from = date_from or date_to - timedelta(days=29)
+    if date_to < date_from:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    if (date_to - date_from).days >= STATS_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range too large (max {STATS_MAX_DAYS} days)")
+    
+    series = await asyncio.gather(*(rollups.read(metric, date_from, date_to) for metric in METRICS))
+    return {"from": date_from, "to": date_to, **dict(zip(METRICS, series))}
 
 # Email subscription endpoints
 @api_router.post("/email-subscribe")
@@ -304,12 +599,9 @@ async def subscribe_email(email_data: dict):
     if not email:
         raise HTTPException(status_code=400, detail="Email required")
     
-    # Check if email already exists
-    existing = await db.email_subscriptions.find_one({"email": email})
-    if not existing:
-        subscription = EmailSubscription(email=email)
-        subscription_dict = prepare_for_mongo(subscription.dict())
-        await db.email_subscriptions.insert_one(subscription_dict)
+    # Queue the subscription; the buffer deduplicates and writes it in bulk
+    subscription = EmailSubscription(email=email)
+    subscription_buffer.add(to_mongo(subscription))
     
     # Return actual thesis document download link
     return {"download_url": "https://customer-assets.emergentagent.com/job_saas-launchpad/artifacts/x9nuwx94_YEYO%20LAB%20Building%20Africa%E2%80%99s%20AI-SaaS%20Exit%20Engine.pdf", "message": "Thank you! Your download will begin shortly."}
@@ -321,42 +613,79 @@ async def root():
 
 @api_router.get("/health")
 async def health_check():
-    """Health check endpoint"""
-    try:
-        # Check database connection
-        await client.admin.command('ping')
-        return {"status": "healthy", "database": "connected"}
-    except Exception as e:
-        return {"status": "unhealthy", "database": "disconnected", "error": str(e)}
+    """Health check endpoint, answered from the background prober's last result"""
+    health = health_prober.snapshot()
+    if health['ready']:
+        return {"status": "healthy", "database": "connected", "pool": registry.pool_snapshot()}
+    return {"status": "unhealthy", "database": "disconnected", "error": health['error'] or "stale health probe", "pool": registry.pool_snapshot()}
+
+@api_router.get("/health/live")
+async def liveness():
+    """Liveness: the process and its event loop respond; never touches Mongo"""
+    return {"status": "alive"}
+
+@api_router.get("/health/ready")
+async def readiness():
+    """Readiness from the cached probe; 503 when Mongo is down or the probe is stale"""
+    health = health_prober.snapshot()
+    return FastJSONResponse(
+        {"status": "ready" if health['ready'] else "not ready", **health},
+        status_code=200 if health['ready'] else 503
+    )
+
+@api_router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus metrics"""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+def collect_runtime_metrics():
+    """Gauges read from the hashing pool, Mongo pool, principal cache and subscription buffer"""
+    hashing = hashing_executor.stats()
+    yield ("auth_hashing_queue_depth", "gauge", "bcrypt jobs waiting for a pool slot", {}, hashing['queue_depth'])
+    yield ("auth_hashing_in_flight", "gauge", "bcrypt jobs running", {}, hashing['in_flight'])
+    for state, value in registry.pool_snapshot().items():
+        yield ("mongodb_pool_connections", "gauge", "Mongo connection pool state", {"state": state}, value)
+    for cache, stats in principal_cache.stats().items():
+        yield ("principal_cache_hits_total", "counter", "Principal cache hits", {"cache": cache}, stats['hits'])
+        yield ("principal_cache_misses_total", "counter", "Principal cache misses", {"cache": cache}, stats['misses'])
+        yield ("principal_cache_entries", "gauge", "Principal cache entries", {"cache": cache}, stats['size'])
+    if health_prober.latency_ms is not None:
+        yield ("mongodb_ping_latency_seconds", "gauge", "Latency of the last background ping", {}, health_prober.latency_ms / 1000)
+    yield ("mongodb_ready", "gauge", "1 if the last background ping succeeded and is fresh", {}, int(health_prober.is_ready()))
+    for user_type, count in match_index.stats().items():
+        yield ("match_index_profiles", "gauge", "Profiles in the match index", {"user_type": user_type}, count)
+    yield ("subscription_buffer_pending", "gauge", "Subscriptions waiting to be flushed", {}, subscription_buffer.stats()['pending'])
+    for reason, count in admission.rejected.items():
+        yield ("auth_admission_rejected_total", "counter", "Auth requests refused by admission control", {"reason": reason}, count)
+
+metrics_registry.add_collector(collect_runtime_metrics)
 
 # Include the router in the main app
 app.include_router(api_router)
 
+# Optionally serve the built frontend; mounted last so /api routes match first
+static_app = create_static_app()
+if static_app is not None:
+    app.mount("/", static_app, name="frontend")
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Retry-After", "ETag", "X-Request-ID"],
 )
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
+# Compress API responses; the frontend mount serves its own precompressed variants
+app.add_middleware(ApiGZipMiddleware)
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize database on startup"""
-    try:
-        await init_database()
-        logger.info("Application startup completed")
-    except Exception as e:
-        logger.error(f"Startup failed: {e}")
-        raise
+# Times everything including CORS handling
+app.add_middleware(MetricsMiddleware)
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+# Outermost, so every log line of a request carries its correlation ID
+app.add_middleware(RequestIdMiddleware)
+
+# Configure logging: JSON lines written by a background thread
+configure_logging()
+logger = logging.getLogger(__name__)
@@ -0,0 +1,262 @@
+"""
+Optional serving of the production frontend build with precompressed assets,
+and on-the-fly gzip for API responses
+
+Enabled by pointing FRONTEND_BUILD_DIR at `frontend/build` (built with
+REACT_APP_BACKEND_URL="" so API calls stay same-origin).
+Usage (at build time): python static_files.py ../frontend/build
+"""
+import gzip
+import logging
+import mimetypes
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.gzip import GZipMiddleware, GZipResponder
+from starlette.responses import FileResponse, Response
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip variants are always available
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+FRONTEND_BUILD_DIR = os.environ.get('FRONTEND_BUILD_DIR', '')
+STATIC_PRECOMPRESS = os.environ.get('STATIC_PRECOMPRESS', 'true').lower() in ('1', 'true', 'yes', 'on')
+GZIP_MIN_SIZE = int(os.environ.get('GZIP_MIN_SIZE', '1024'))
+
+COMPRESSIBLE_SUFFIXES = {'.html', '.js', '.css', '.json', '.map', '.svg', '.txt', '.xml', '.ico', '.webmanifest'}
+# Encodings in server preference order, with the suffix of their precompressed variant
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+# Media types worth compressing on the fly; images, fonts and archives already are compressed
+COMPRESSIBLE_MEDIA_TYPES = ('text/', 'application/json', 'application/x-ndjson', 'application/javascript',
+                            'application/xml', 'image/svg+xml')
+
+# Suffix of variants still being written; never indexed or served
+PARTIAL_SUFFIX = '.partial'
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+# CRA puts content-hashed bundles under static/ (e.g. static/js/main.3f2a9c1d.js)
+HASHED_NAME = re.compile(r"\.[0-9a-f]{8,}\.(?:chunk\.)?[a-z0-9]+$")
+
+def _compress(data: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=11)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+def _write_atomic(path: Path, data: bytes):
+    """Write through a temp file in the same directory and rename it over `path`
+
+    Every worker precompresses at startup, so another one may stat or
+    serve `path` at any moment; it sees either the old file or the
+    complete new one, never a partial write.
+    """
+    tmp = tempfile.NamedTemporaryFile(dir=path.parent, prefix=f".{path.name}.", suffix=PARTIAL_SUFFIX, delete=False)
+    try:
+        with tmp:
+            tmp.write(data)
+        os.replace(tmp.name, path)
+    except BaseException:
+        os.unlink(tmp.name)
+        raise
+
+def precompress(build_dir: Path, min_size: int = GZIP_MIN_SIZE) -> int:
+    """Write .br/.gz siblings for compressible files that lack an up-to-date one
+
+    Variants that do not save at least 10% are skipped. Returns the number
+    of variants written.
+    """
+    written = 0
+    for path in build_dir.rglob('*'):
+        if not path.is_file() or path.suffix not in COMPRESSIBLE_SUFFIXES or path.stat().st_size < min_size:
+            continue
+        data = None
+        for encoding, suffix in ENCODINGS:
+            if encoding == 'br' and brotli is None:
+                continue
+            variant = path.with_name(path.name + suffix)
+            if variant.exists() and variant.stat().st_mtime >= path.stat().st_mtime:
+                continue
+            data = data if data is not None else path.read_bytes()
+            compressed = _compress(data, encoding)
+            if len(compressed) <= len(data) * 0.9:
+                _write_atomic(variant, compressed)
+                written += 1
+    return written
+
+def accepted_encodings(header: str) -> List[str]:
+    """Content codings from Accept-Encoding with a non-zero q-value"""
+    accepted = []
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = 1.0
+        match = re.search(r"q=([0-9.]+)", params)
+        if match:
+            try:
+                quality = float(match.group(1))
+            except ValueError:
+                quality = 0.0
+        if coding and quality > 0:
+            accepted.append(coding.strip().lower())
+    return accepted
+
+class _Asset:
+    def __init__(self, path: Path, relative: str):
+        stat = path.stat()
+        self.path = path
+        self.media_type = mimetypes.guess_type(path.name)[0] or 'application/octet-stream'
+        self.etag = f'"{stat.st_size:x}-{int(stat.st_mtime):x}"'
+        self.cache_control = IMMUTABLE_CACHE if relative.startswith('static/') and HASHED_NAME.search(path.name) else REVALIDATE_CACHE
+        self.variants: Dict[str, Path] = {
+            encoding: path.with_name(path.name + suffix)
+            for encoding, suffix in ENCODINGS
+            if path.with_name(path.name + suffix).is_file()
+        }
+        # The build is immutable while we serve it, so stat each file once
+        self.stats = {path: stat, **{variant: variant.stat() for variant in self.variants.values()}}
+
+class StaticFrontend:
+    """ASGI app serving the frontend build, mounted after the API routes
+
+    Files are indexed once at startup together with their precompressed
+    variants, so a request is a dict lookup plus Accept-Encoding
+    negotiation. Content-hashed bundles are cached as immutable; everything
+    else revalidates by ETag. index.html and its variants are held in
+    memory and also answer unknown paths, for client-side routes.
+    """
+
+    def __init__(self, build_dir: str, precompress_assets: bool = STATIC_PRECOMPRESS):
+        self.build_dir = Path(build_dir).resolve()
+        if not (self.build_dir / 'index.html').is_file():
+            raise RuntimeError(f"No index.html in FRONTEND_BUILD_DIR {self.build_dir}")
+        if precompress_assets:
+            try:
+                written = precompress(self.build_dir)
+                if written:
+                    logger.info(f"Precompressed {written} frontend asset variants")
+            except OSError as e:
+                # A read-only build directory still serves whatever variants it ships with
+                logger.warning(f"Could not precompress frontend assets: {e}")
+
+        self.assets: Dict[str, _Asset] = {}
+        skipped_suffixes = tuple(suffix for _, suffix in ENCODINGS) + (PARTIAL_SUFFIX,)
+        for path in self.build_dir.rglob('*'):
+            if path.is_file() and not path.name.endswith(skipped_suffixes):
+                relative = path.relative_to(self.build_dir).as_posix()
+                self.assets[relative] = _Asset(path, relative)
+
+        self.index = self.assets['index.html']
+        self.index_bodies: Dict[Optional[str], bytes] = {None: self.index.path.read_bytes()}
+        for encoding, variant in self.index.variants.items():
+            self.index_bodies[encoding] = variant.read_bytes()
+        logger.info(f"Serving {len(self.assets)} frontend files from {self.build_dir}")
+
+    def _negotiate(self, asset: _Asset, accept_encoding: str) -> Tuple[Optional[str], Path]:
+        if asset.variants and accept_encoding:
+            accepted = accepted_encodings(accept_encoding)
+            for encoding, _ in ENCODINGS:
+                if encoding in asset.variants and (encoding in accepted or '*' in accepted):
+                    return encoding, asset.variants[encoding]
+        return None, asset.path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+        if scope["method"] not in ("GET", "HEAD"):
+            await Response(status_code=405, headers={"Allow": "GET, HEAD"})(scope, receive, send)
+            return
+
+        headers = {name.decode("latin-1"): value.decode("latin-1") for name, value in scope["headers"]}
+        relative = scope["path"][len(scope.get("root_path", "")):].lstrip("/") or "index.html"
+        asset = self.assets.get(relative)
+        if asset is None:
+            # Unknown paths with an extension are real misses; the rest are client-side routes
+            if '.' in relative.rsplit('/', 1)[-1]:
+                await Response(status_code=404)(scope, receive, send)
+                return
+            asset = self.index
+
+        encoding, path = self._negotiate(asset, headers.get("accept-encoding", ""))
+        response_headers = {"Cache-Control": asset.cache_control, "ETag": asset.etag, "Vary": "Accept-Encoding"}
+        if encoding:
+            response_headers["Content-Encoding"] = encoding
+            response_headers["ETag"] = f'{asset.etag[:-1]}-{encoding}"'
+
+        if headers.get("if-none-match") == response_headers["ETag"]:
+            await Response(status_code=304, headers=response_headers)(scope, receive, send)
+            return
+
+        if asset is self.index:
+            response = Response(self.index_bodies[encoding], media_type=asset.media_type, headers=response_headers)
+        else:
+            response = FileResponse(path, media_type=asset.media_type, headers=response_headers, stat_result=asset.stats[path])
+        await response(scope, receive, send)
+
+class _GZipResponder(GZipResponder):
+    """Starlette's responder, passing through incompressible media types and weakening ETags it compresses"""
+
+    async def __call__(self, scope, receive, send):
+        async def send_with_weak_etag(message):
+            if message["type"] == "http.response.start" and not self.content_encoding_set:
+                headers = MutableHeaders(raw=message["headers"])
+                etag = headers.get("etag")
+                if headers.get("content-encoding") == "gzip" and etag and not etag.startswith("W/"):
+                    # The gzipped bytes differ from the identity ones, so they cannot share a strong ETag
+                    headers["etag"] = f"W/{etag}"
+            await send(message)
+
+        await super().__call__(scope, receive, send_with_weak_etag)
+
+    async def send_with_gzip(self, message):
+        if message["type"] == "http.response.start":
+            media_type = Headers(raw=message["headers"]).get("content-type", "")
+            await super().send_with_gzip(message)
+            if not media_type.startswith(COMPRESSIBLE_MEDIA_TYPES):
+                # Reuse the pass-through path Starlette takes for already-encoded responses
+                self.content_encoding_set = True
+            return
+        await super().send_with_gzip(message)
+
+class ApiGZipMiddleware(GZipMiddleware):
+    """Gzip for dynamic responses under `prefix` only
+
+    The frontend mount serves its own precompressed variants, so compressing
+    it again here would only burn CPU on every asset request.
+    """
+
+    def __init__(self, app, minimum_size: int = GZIP_MIN_SIZE, compresslevel: int = 6, prefix: str = "/api"):
+        super().__init__(app, minimum_size=minimum_size, compresslevel=compresslevel)
+        self.prefix = prefix
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not (scope["path"] == self.prefix or scope["path"].startswith(self.prefix + "/")):
+            await self.app(scope, receive, send)
+            return
+        if "gzip" not in Headers(scope=scope).get("accept-encoding", ""):
+            await self.app(scope, receive, send)
+            return
+        responder = _GZipResponder(self.app, self.minimum_size, compresslevel=self.compresslevel)
+        await responder(scope, receive, send)
+
+def create_static_app(build_dir: str = FRONTEND_BUILD_DIR) -> Optional[StaticFrontend]:
+    """The frontend app when FRONTEND_BUILD_DIR is set, otherwise None"""
+    if not build_dir:
+        return None
+    return StaticFrontend(build_dir)
+
+if __name__ == "__main__":
+    import typer
+
+    def main(build_dir: Path = typer.Argument(..., help="Frontend build directory")):
+        """Precompress the frontend build so workers start without compressing"""
+        count = precompress(build_dir)
+        typer.echo(f"Wrote {count} compressed variants{'' if brotli else ' (gzip only: brotli is not installed)'}")
+
+    typer.run(main)
@@ -0,0 +1,192 @@
+"""
+Queue-based JSON logging with per-request correlation IDs
+"""
+import atexit
+import contextvars
+import copy
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+import orjson
+
+# Configuration
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')  # "json" or "text"
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', '10000'))
+LOG_RATE_LIMIT_WINDOW = float(os.environ.get('LOG_RATE_LIMIT_WINDOW', '10'))
+LOG_RATE_LIMIT_BURST = int(os.environ.get('LOG_RATE_LIMIT_BURST', '5'))
+
+REQUEST_ID_HEADER = "x-request-id"
+# Client-supplied IDs are echoed into logs, so only accept short, plain ones
+REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+# Correlation ID of the request being served, set by RequestIdMiddleware
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+# LogRecord attributes that are not user-supplied `extra` fields
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id", "suppressed"}
+
+class RequestIdFilter(logging.Filter):
+    """Stamps records with the current request ID; runs before queueing, in the caller's context"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+class RateLimitFilter(logging.Filter):
+    """Lets through `burst` records per message template and `window` seconds
+
+    Records are keyed by logger and unformatted message, so %-style calls
+    such as logger.warning("Invalid token: %s", e) share one budget. The
+    first record after a suppressed stretch carries the number dropped.
+    """
+
+    def __init__(self, window: float = LOG_RATE_LIMIT_WINDOW, burst: int = LOG_RATE_LIMIT_BURST, max_keys: int = 10000):
+        super().__init__()
+        self.window = window
+        self.burst = burst
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        # key -> [window start, records allowed in window, records suppressed]
+        self._windows: Dict[Tuple[str, str], list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.ERROR and record.exc_info:
+            return True
+        key = (record.name, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            state = self._windows.get(key)
+            if state is None or now - state[0] >= self.window:
+                suppressed = state[2] if state else 0
+                if len(self._windows) >= self.max_keys:
+                    self._windows.clear()
+                self._windows[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+            if state[1] < self.burst:
+                state[1] += 1
+                return True
+            state[2] += 1
+            return False
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Enqueues records without formatting them and drops them when the queue is full
+
+    The stock QueueHandler renders the message in the calling thread; here
+    %-formatting, exception rendering and I/O all happen on the listener
+    thread, so the event loop only pays for a copy and a put_nowait.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return copy.copy(record)
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, message, request_id and extras"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        suppressed = getattr(record, "suppressed", None)
+        if suppressed:
+            entry["suppressed"] = suppressed
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return orjson.dumps(entry, default=str).decode("utf-8")
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        record.request_id = getattr(record, "request_id", None) or "-"
+        return super().format(record)
+
+def configure_logging(level: str = LOG_LEVEL, output_format: str = LOG_FORMAT) -> logging.handlers.QueueListener:
+    """Route every log record through a bounded queue to a stderr writer thread
+
+    Replaces the root logger's handlers, so it is safe to call once at
+    startup after other modules have created their loggers.
+    """
+    stream_handler = logging.StreamHandler(sys.stderr)
+    if output_format == "json":
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(TextFormatter('%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s'))
+
+    log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter())
+    queue_handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+class RequestIdMiddleware:
+    """Pure ASGI middleware binding a correlation ID to each request
+
+    Reuses a well-formed X-Request-ID from the client or proxy, otherwise
+    generates one, and echoes it on the response.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope.get("headers", ()):
+            if name == REQUEST_ID_HEADER.encode("latin-1"):
+                candidate = value.decode("latin-1")
+                if REQUEST_ID_PATTERN.match(candidate):
+                    request_id = candidate
+                break
+        request_id = request_id or uuid.uuid4().hex
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(REQUEST_ID_HEADER.encode("latin-1"), request_id.encode("latin-1"))]
+            await send(message)
+
+        token = request_id_var.set(request_id)
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(token)
@@ -0,0 +1,104 @@
+"""
+Write-behind buffering for email subscriptions
+"""
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, List
+from pymongo.errors import BulkWriteError
+from periodic import PeriodicTask
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+SUBSCRIPTION_FLUSH_SIZE = int(os.environ.get('SUBSCRIPTION_FLUSH_SIZE', '500'))
+SUBSCRIPTION_FLUSH_INTERVAL = float(os.environ.get('SUBSCRIPTION_FLUSH_INTERVAL', '1.0'))
+SUBSCRIPTION_MAX_PENDING = int(os.environ.get('SUBSCRIPTION_MAX_PENDING', '100000'))
+
+class UpsertBuffer:
+    """Deduplicates documents by key in memory and writes them in bulk
+
+    Pending documents are handed to `writer` (e.g.
+    SubscriptionRepository.upsert_many) once `flush_size` keys are pending or
+    every `flush_interval` seconds, whichever comes first. The writer returns
+    the documents it inserted and only sets fields on insert, so a key
+    that already exists in the collection is left untouched and the unique
+    index settles races between workers.
+    """
+
+    def __init__(self, writer: Callable[[List[Dict[str, Any]]], Awaitable[List[Dict[str, Any]]]], key_field: str,
+                 flush_size: int = SUBSCRIPTION_FLUSH_SIZE,
+                 flush_interval: float = SUBSCRIPTION_FLUSH_INTERVAL,
+                 max_pending: int = SUBSCRIPTION_MAX_PENDING):
+        self.writer = writer
+        self.key_field = key_field
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: Dict[Any, Dict[str, Any]] = {}
+        self._flush_lock = asyncio.Lock()
+        self._flusher = PeriodicTask("Upsert buffer background flush", self.flush, flush_interval)
+
+        # Metrics
+        self.flushes = 0
+        self.written = 0
+        self.dropped = 0
+        self.failures = 0
+
+    def add(self, document: Dict[str, Any]):
+        """Queue a document; repeated keys before the next flush are ignored"""
+        key = document[self.key_field]
+        if key in self._pending:
+            return
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            logger.warning(f"Upsert buffer full, dropping {self.key_field}={key}")
+            return
+
+        self._pending[key] = document
+        if len(self._pending) >= self.flush_size and not self._flush_lock.locked():
+            asyncio.get_running_loop().create_task(self.flush())
+
+    async def flush(self):
+        """Write every pending document in one bulk call"""
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, {}
+
+            try:
+                self.written += len(await self.writer(list(batch.values())))
+            except BulkWriteError as e:
+                # Individual documents were rejected; retrying them would fail the same way
+                errors = e.details.get('writeErrors', [])
+                self.written += e.details.get('nUpserted', 0)
+                self.failures += 1
+                logger.error(f"Upsert buffer flush had {len(errors)} write errors: {errors[0].get('errmsg') if errors else e}")
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"Upsert buffer flush failed, requeueing {len(batch)} documents: {e}")
+                for key, document in batch.items():
+                    if len(self._pending) < self.max_pending:
+                        self._pending.setdefault(key, document)
+                    else:
+                        self.dropped += 1
+            finally:
+                self.flushes += 1
+
+    def start(self):
+        """Flush every `flush_interval` in the background"""
+        self._flusher.start()
+
+    async def stop(self):
+        """Stop the periodic flush and write whatever is still pending"""
+        await self._flusher.stop()
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'pending': len(self._pending),
+            'flushes': self.flushes,
+            'written': self.written,
+            'dropped': self.dropped,
+            'failures': self.failures,
+        }
@@ -0,0 +1,286 @@
+"""
+Bulk user import from CSV or JSONL, with bcrypt spread across CPU cores
+
+Usage:
+    python user_import.py import cohort.csv
+    python user_import.py import import_reports/cohort.<time>.rejected.jsonl   # retry fixed rejects
+    python user_import.py generate fixtures.jsonl --count 10000
+
+Rejection reports never contain passwords; add them back to the rows you
+fix before importing a report again.
+"""
+import asyncio
+import csv
+import json
+import logging
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+from auth import AuthManager, PasswordValidator
+from models import User, UserRegister
+from mongo_codec import to_mongo
+from rollups import StatsRollups, ROLLUP_COLLECTION
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE', '1000'))
+IMPORT_REPORT_DIR = os.environ.get('IMPORT_REPORT_DIR', 'import_reports')
+
+DUPLICATE_KEY_ERROR = 11000
+OPTIONAL_FIELDS = ("company", "additional_info")
+# Never written to rejection reports
+SECRET_FIELDS = frozenset({"password"})
+
+def read_rows(path: Path) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Yield (line number, row) from a CSV or JSONL file without loading it whole
+
+    JSONL lines that carry a "row" key (as rejection reports do) yield that
+    row, so a fixed report can be fed back in once passwords are restored.
+    """
+    with path.open(newline='', encoding='utf-8') as handle:
+        if path.suffix.lower() == '.csv':
+            for number, row in enumerate(csv.DictReader(handle), start=2):
+                yield number, row
+            return
+        for number, line in enumerate(handle, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield number, {"__error__": f"Invalid JSON: {e}"}
+                continue
+            if isinstance(row, dict) and isinstance(row.get("row"), dict):
+                row = row["row"]
+            yield number, row if isinstance(row, dict) else {"__error__": "Expected a JSON object"}
+
+def validate_row(row: Dict[str, Any]) -> Tuple[Optional[UserRegister], Optional[str]]:
+    """The same checks /api/auth/register applies, as (user, error)"""
+    if "__error__" in row:
+        return None, row["__error__"]
+    data = {key: (value.strip() if isinstance(value, str) else value) for key, value in row.items() if key}
+    for field in OPTIONAL_FIELDS:
+        if data.get(field) == "":
+            data[field] = None
+    try:
+        user = UserRegister(**data)
+    except ValidationError as e:
+        error = e.errors()[0]
+        return None, f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+    is_valid, message = PasswordValidator.validate_password(user.password)
+    if not is_valid:
+        return None, message
+    return user, None
+
+def hash_passwords(passwords: List[str]) -> List[str]:
+    """Runs in a worker process; one call hashes a whole slice to amortize IPC"""
+    return [AuthManager.hash_password(password) for password in passwords]
+
+class ImportReport:
+    """Rejected rows as JSONL, each with its line, reason and original row
+
+    Passwords are dropped from the stored rows. The rest is still personal
+    data (names, emails), so the file is created readable by its owner only.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        descriptor = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        # The mode only applies to new files; tighten a report left by an earlier run too
+        os.chmod(path, 0o600)
+        self._handle = os.fdopen(descriptor, 'w', encoding='utf-8')
+        self.rejected = 0
+
+    def reject(self, line: int, error: str, row: Dict[str, Any]):
+        row = {
+            key: value for key, value in row.items()
+            if key != "__error__" and str(key).strip().lower() not in SECRET_FIELDS
+        }
+        self._handle.write(json.dumps({"line": line, "error": error, "row": row}, default=str) + "\n")
+        self.rejected += 1
+
+    def close(self):
+        self._handle.close()
+
+class UserImporter:
+    """Validates, hashes and inserts users chunk by chunk
+
+    Per chunk: one query finds emails that already exist (skipped, so a
+    re-run after an interruption does no bcrypt work for them), passwords
+    are hashed in slices across the process pool, and users are written
+    with a single unordered insert_many. Signup rollups are updated the
+    same way the register endpoint does.
+    """
+
+    def __init__(self, db, pool: ProcessPoolExecutor, workers: int, report: ImportReport,
+                 chunk_size: int = IMPORT_CHUNK_SIZE):
+        self.users = db.users
+        self.rollups = StatsRollups(db[ROLLUP_COLLECTION])
+        self.pool = pool
+        self.workers = workers
+        self.report = report
+        self.chunk_size = chunk_size
+        self.counts = {"read": 0, "imported": 0, "skipped": 0}
+
+    async def _hash(self, passwords: List[str]) -> List[str]:
+        loop = asyncio.get_running_loop()
+        size = max(1, -(-len(passwords) // self.workers))
+        slices = [passwords[start:start + size] for start in range(0, len(passwords), size)]
+        hashed = await asyncio.gather(*(loop.run_in_executor(self.pool, hash_passwords, part) for part in slices))
+        return [value for part in hashed for value in part]
+
+    async def _write_chunk(self, chunk: List[Tuple[int, Dict[str, Any], UserRegister]]):
+        existing = {
+            user['email'] async for user in self.users.find(
+                {"email": {"$in": [user.email for _, _, user in chunk]}}, {"_id": 0, "email": 1}
+            )
+        }
+        pending = [(line, row, user) for line, row, user in chunk if user.email not in existing]
+        self.counts["skipped"] += len(chunk) - len(pending)
+        if not pending:
+            return
+
+        hashes = await self._hash([user.password for _, _, user in pending])
+        documents = []
+        for (_, _, user), password_hash in zip(pending, hashes):
+            document = to_mongo(User(**user.dict(exclude={"password"})))
+            document['password_hash'] = password_hash
+            documents.append(document)
+
+        failed = {}
+        try:
+            await self.users.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            failed = {error['index']: error for error in e.details.get('writeErrors', [])}
+
+        inserted = []
+        for position, ((line, row, _), document) in enumerate(zip(pending, documents)):
+            error = failed.get(position)
+            if error is None:
+                self.counts["imported"] += 1
+                inserted.append(document)
+            elif error.get('code') == DUPLICATE_KEY_ERROR:
+                # Registered concurrently since the existence check
+                self.counts["skipped"] += 1
+            else:
+                self.report.reject(line, error.get('errmsg', 'Write failed'), row)
+        await self.rollups.record_signups(inserted)
+
+    async def run(self, rows: Iterator[Tuple[int, Dict[str, Any]]], progress=None):
+        seen = set()
+        chunk: List[Tuple[int, Dict[str, Any], UserRegister]] = []
+        for line, row in rows:
+            self.counts["read"] += 1
+            user, error = validate_row(row)
+            if user is not None and user.email in seen:
+                error = "Duplicate email in input"
+            if error:
+                self.report.reject(line, error, row)
+                continue
+            seen.add(user.email)
+            chunk.append((line, row, user))
+            if len(chunk) >= self.chunk_size:
+                await self._write_chunk(chunk)
+                chunk = []
+                if progress:
+                    progress(self.counts, self.report.rejected)
+        if chunk:
+            await self._write_chunk(chunk)
+        return {**self.counts, "rejected": self.report.rejected}
+
+# Vocabulary for generated profiles, so fixtures also exercise matching
+SECTORS = ["fintech", "payments", "agritech", "healthtech", "edtech", "logistics", "insurtech", "climate", "ecommerce", "saas"]
+FOCUS = ["mobile money", "credit scoring", "supply chain", "telemedicine", "marketplaces", "B2B software",
+         "solar energy", "data platforms", "AI tooling", "SME lending"]
+REGIONS = ["Lagos", "Nairobi", "Johannesburg", "Cape Town", "Accra", "Kigali", "Cairo", "Casablanca"]
+
+def fixture_rows(count: int, seed: int, password: str) -> Iterator[Dict[str, Any]]:
+    rng = random.Random(seed)
+    for index in range(count):
+        user_type = "investor" if index % 4 == 0 else "founder"
+        sector = rng.choice(SECTORS)
+        yield {
+            "name": f"Fixture User {index}",
+            "email": f"fixture-{seed}-{index}@example.com",
+            "password": password,
+            "user_type": user_type,
+            "company": f"{sector.title()} {rng.choice(REGIONS)} {index}",
+            "additional_info": f"{sector} {rng.choice(FOCUS)} {rng.choice(FOCUS)} in {rng.choice(REGIONS)}",
+        }
+
+if __name__ == "__main__":
+    import typer
+    from database import registry, close_client
+
+    cli = typer.Typer(help="Bulk user import")
+
+    @cli.command("import")
+    def import_users(
+        source: Path = typer.Argument(..., exists=True, dir_okay=False, help="CSV or JSONL file"),
+        report: Optional[Path] = typer.Option(
+            None, help=f"Rejected rows (JSONL, without passwords); defaults to {IMPORT_REPORT_DIR}/<source>.<time>.rejected.jsonl"
+        ),
+        chunk_size: int = typer.Option(IMPORT_CHUNK_SIZE, help="Users per insert_many"),
+        workers: int = typer.Option(os.cpu_count() or 1, help="Hashing processes")
+    ):
+        """Import users; existing emails are skipped, so re-running is safe"""
+        # Kept apart from the source, which may sit in a shared drop folder
+        report_path = report or Path(IMPORT_REPORT_DIR) / f"{source.stem}.{time.strftime('%Y%m%dT%H%M%S')}.rejected.jsonl"
+        if report_path.resolve() == source.resolve():
+            raise typer.BadParameter("The report must not overwrite the source file")
+
+        def progress(counts, rejected):
+            typer.echo(f"read {counts['read']}  imported {counts['imported']}  skipped {counts['skipped']}  rejected {rejected}", err=True)
+
+        async def main():
+            rejected = ImportReport(report_path)
+            try:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    importer = UserImporter(registry.get_db(), pool, workers, rejected, chunk_size)
+                    return await importer.run(read_rows(source), progress)
+            finally:
+                rejected.close()
+                close_client()
+
+        started = time.perf_counter()
+        result = asyncio.run(main())
+        elapsed = time.perf_counter() - started
+        typer.echo(
+            f"Imported {result['imported']}, skipped {result['skipped']} existing, rejected {result['rejected']} "
+            f"of {result['read']} rows in {elapsed:.1f}s ({result['imported'] / elapsed:.0f} users/s)"
+        )
+        if result['rejected']:
+            typer.echo(
+                f"Rejected rows written to {report_path} without passwords; "
+                "fix them, add the passwords back and import that file to retry"
+            )
+            raise typer.Exit(code=1)
+        report_path.unlink(missing_ok=True)
+
+    @cli.command()
+    def generate(
+        output: Path = typer.Argument(..., help="Output .csv or .jsonl file"),
+        count: int = typer.Option(1000, help="Users to generate"),
+        seed: int = typer.Option(0, help="Seed; also part of each email, so seeds do not collide"),
+        password: str = typer.Option("FixturePass123", help="Password for every fixture user")
+    ):
+        """Write load-test fixture users"""
+        rows = fixture_rows(count, seed, password)
+        with output.open('w', newline='', encoding='utf-8') as handle:
+            if output.suffix.lower() == '.csv':
+                writer = csv.DictWriter(handle, fieldnames=["name", "email", "password", "user_type", "company", "additional_info"])
+                writer.writeheader()
+                writer.writerows(rows)
+            else:
+                for row in rows:
+                    handle.write(json.dumps(row) + "\n")
+        typer.echo(f"Wrote {count} users to {output}")
+
+    cli()
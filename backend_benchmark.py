@@ -0,0 +1,315 @@
+"""
+In-process load and latency benchmark for the YEYO LAB API
+
+Drives the ASGI app directly (no network hop) against a local mongod, or an
+in-memory Motor stand-in (mongomock-motor) when no --mongo-url is given, and
+reports per-endpoint latency percentiles, throughput and event-loop lag.
+Fixtures go to a throwaway yeyo_lab_bench_* database that is dropped at the
+end, whatever DB_NAME is set to. Results can be saved as a JSON baseline,
+but only from a run without failed requests; later runs fail when they
+regress or fail more often.
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import typer
+
+BACKEND_DIR = Path(__file__).parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+PASSWORD = "BenchPass123"
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an unsorted list"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+class LoopLagMonitor:
+    """Measures how late a periodic timer fires, i.e. how long the loop was blocked"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - expected))
+
+    def start(self):
+        self.samples = []
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> Dict[str, float]:
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        return {
+            "p99_ms": percentile(self.samples, 99) * 1000,
+            "max_ms": (max(self.samples) if self.samples else 0.0) * 1000,
+        }
+
+class Recorder:
+    """Collects latencies and status codes per endpoint label"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    async def call(self, label: str, request: Callable, expected=(200,)):
+        started = time.perf_counter()
+        try:
+            response = await request()
+            ok = response.status_code in expected
+        except Exception:
+            response, ok = None, False
+        self.latencies.setdefault(label, []).append(time.perf_counter() - started)
+        if not ok:
+            self.errors[label] = self.errors.get(label, 0) + 1
+        return response
+
+    def summary(self, elapsed: float) -> Dict[str, Dict[str, float]]:
+        return {
+            label: {
+                "requests": len(samples),
+                "errors": self.errors.get(label, 0),
+                "p50_ms": percentile(samples, 50) * 1000,
+                "p95_ms": percentile(samples, 95) * 1000,
+                "p99_ms": percentile(samples, 99) * 1000,
+                "throughput_rps": len(samples) / elapsed if elapsed else 0.0,
+            }
+            for label, samples in self.latencies.items()
+        }
+
+async def run_concurrently(count: int, concurrency: int, task: Callable[[int], Any]):
+    """Run task(0..count-1) with at most `concurrency` in flight"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def guarded(index: int):
+        async with semaphore:
+            await task(index)
+
+    await asyncio.gather(*(guarded(index) for index in range(count)))
+
+async def register(http, recorder: Recorder, label: str = "POST /api/auth/register") -> Optional[Dict[str, Any]]:
+    email = f"bench-{uuid.uuid4().hex[:12]}@example.com"
+    response = await recorder.call(label, lambda: http.post("/api/auth/register", json={
+        "name": "Bench User", "email": email, "password": PASSWORD, "user_type": "founder",
+        "company": "Bench Co", "additional_info": "benchmark fixture",
+    }))
+    if response is not None and response.status_code == 200:
+        return {"email": email, "token": response.json()["access_token"]}
+    return None
+
+# Scenarios: each receives the client, a recorder, the request count and concurrency
+
+async def scenario_auth_mix(http, recorder: Recorder, count: int, concurrency: int):
+    """One registration for every four logins"""
+    seed = [user for user in await asyncio.gather(*(register(http, Recorder()) for _ in range(min(concurrency, 8)))) if user]
+
+    async def task(index: int):
+        if index % 5 == 0 or not seed:
+            await register(http, recorder)
+        else:
+            user = seed[index % len(seed)]
+            await recorder.call("POST /api/auth/login", lambda: http.post(
+                "/api/auth/login", json={"email": user["email"], "password": PASSWORD}
+            ))
+
+    await run_concurrently(count, concurrency, task)
+
+async def scenario_profile_reads(http, recorder: Recorder, count: int, concurrency: int):
+    """Authenticated profile reads spread over a few users"""
+    users = [user for user in await asyncio.gather(*(register(http, Recorder()) for _ in range(4))) if user]
+
+    async def task(index: int):
+        headers = {"Authorization": f"Bearer {users[index % len(users)]['token']}"}
+        await recorder.call("GET /api/auth/profile", lambda: http.get("/api/auth/profile", headers=headers))
+
+    await run_concurrently(count, concurrency, task)
+
+async def scenario_booking_burst(http, recorder: Recorder, count: int, concurrency: int):
+    """Single bookings into distinct slots, then paged reads of the list"""
+    from availability import BOOKING_SLOTS
+    user = await register(http, Recorder())
+    headers = {"Authorization": f"Bearer {user['token']}"} if user else {}
+    # Far-future days unique to this run, so repeated runs against mongod do not collide
+    first_day = date(2100, 1, 1) + timedelta(days=(uuid.uuid4().int % 1000) * 1000)
+
+    async def task(index: int):
+        booking = {
+            "name": "Bench", "email": "bench@example.com",
+            "date": (first_day + timedelta(days=index // len(BOOKING_SLOTS))).isoformat(),
+            "time": BOOKING_SLOTS[index % len(BOOKING_SLOTS)],
+        }
+        await recorder.call("POST /api/bookings", lambda: http.post("/api/bookings", json=booking), expected=(200, 409))
+        if index % 10 == 0:
+            await recorder.call("GET /api/bookings", lambda: http.get("/api/bookings", params={"limit": 100}, headers=headers))
+
+    await run_concurrently(count, concurrency, task)
+
+async def scenario_subscribe_flood(http, recorder: Recorder, count: int, concurrency: int):
+    """Download clicks where every address repeats a few times"""
+    async def task(index: int):
+        email = f"flood-{index // 3}@example.com"
+        await recorder.call("POST /api/email-subscribe", lambda: http.post("/api/email-subscribe", json={"email": email}))
+
+    await run_concurrently(count, concurrency, task)
+
+SCENARIOS = {
+    "auth_mix": scenario_auth_mix,
+    "profile_reads": scenario_profile_reads,
+    "booking_burst": scenario_booking_burst,
+    "subscribe_flood": scenario_subscribe_flood,
+}
+
+def install_database(mongo_url: Optional[str]):
+    """Point the shared client registry at mongod or an in-memory stand-in"""
+    import database
+    if mongo_url:
+        os.environ["MONGO_URL"] = mongo_url
+        return
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        raise typer.BadParameter("Pass --mongo-url or install mongomock-motor for an in-memory database")
+    from mongo_codec import CODEC_OPTIONS
+    database.registry.set_client(AsyncMongoMockClient(tz_aware=CODEC_OPTIONS.tz_aware))
+
+async def run_benchmark(scenarios: List[str], requests: int, concurrency: int) -> Dict[str, Any]:
+    import httpx
+    import server
+
+    results: Dict[str, Any] = {}
+    async with server.app.router.lifespan_context(server.app):
+        try:
+            transport = httpx.ASGITransport(app=server.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+                for name in scenarios:
+                    recorder, monitor = Recorder(), LoopLagMonitor()
+                    monitor.start()
+                    started = time.perf_counter()
+                    await SCENARIOS[name](http, recorder, requests, concurrency)
+                    elapsed = time.perf_counter() - started
+                    results[name] = {
+                        "elapsed_s": elapsed,
+                        "loop_lag": await monitor.stop(),
+                        "endpoints": recorder.summary(elapsed),
+                    }
+        finally:
+            # The database only ever holds this run's fixtures
+            await server.client.drop_database(server.db.name)
+    return results
+
+def error_rate(stats: Dict[str, float]) -> float:
+    return stats["errors"] / stats["requests"] if stats["requests"] else 0.0
+
+def endpoints_with_errors(results: Dict[str, Any]) -> List[str]:
+    return [
+        f"{name} {label}: {stats['errors']} of {stats['requests']} requests failed"
+        for name, scenario in results.items()
+        for label, stats in scenario["endpoints"].items()
+        if stats["errors"]
+    ]
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Regressions in error rate, or beyond `tolerance` in p95 latency, throughput or loop lag
+
+    Failed requests are often fast, so a higher error rate is a regression
+    by itself; otherwise a broken endpoint would pass as a faster one.
+    """
+    regressions = []
+    for name, scenario in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for label, stats in scenario["endpoints"].items():
+            base_stats = base["endpoints"].get(label)
+            if error_rate(stats) > (error_rate(base_stats) if base_stats else 0.0):
+                regressions.append(
+                    f"{name} {label}: {stats['errors']} of {stats['requests']} requests failed"
+                    + (f" vs baseline {base_stats['errors']} of {base_stats['requests']}" if base_stats else "")
+                )
+            if not base_stats:
+                continue
+            if stats["p95_ms"] > base_stats["p95_ms"] * (1 + tolerance):
+                regressions.append(f"{name} {label}: p95 {stats['p95_ms']:.1f}ms vs baseline {base_stats['p95_ms']:.1f}ms")
+            if stats["throughput_rps"] < base_stats["throughput_rps"] * (1 - tolerance):
+                regressions.append(f"{name} {label}: {stats['throughput_rps']:.1f} rps vs baseline {base_stats['throughput_rps']:.1f} rps")
+        if scenario["loop_lag"]["p99_ms"] > base["loop_lag"]["p99_ms"] * (1 + tolerance) + 1.0:
+            regressions.append(f"{name}: loop lag p99 {scenario['loop_lag']['p99_ms']:.1f}ms vs baseline {base['loop_lag']['p99_ms']:.1f}ms")
+    return regressions
+
+def print_report(results: Dict[str, Any]):
+    for name, scenario in results.items():
+        lag = scenario["loop_lag"]
+        typer.echo(f"\n{name}  ({scenario['elapsed_s']:.2f}s, loop lag p99 {lag['p99_ms']:.1f}ms max {lag['max_ms']:.1f}ms)")
+        typer.echo(f"  {'endpoint':32} {'reqs':>6} {'errs':>5} {'p50':>8} {'p95':>8} {'p99':>8} {'rps':>8}")
+        for label, stats in scenario["endpoints"].items():
+            typer.echo(
+                f"  {label:32} {stats['requests']:>6} {stats['errors']:>5} "
+                f"{stats['p50_ms']:>7.1f}ms {stats['p95_ms']:>7.1f}ms {stats['p99_ms']:>7.1f}ms {stats['throughput_rps']:>8.1f}"
+            )
+
+def main(
+    scenario: List[str] = typer.Option(list(SCENARIOS), help="Scenarios to run"),
+    requests: int = typer.Option(200, help="Requests per scenario"),
+    concurrency: int = typer.Option(20, help="Requests in flight per scenario"),
+    mongo_url: Optional[str] = typer.Option(None, help="Local mongod; defaults to an in-memory stand-in"),
+    baseline: Path = typer.Option(Path("benchmarks/load_baseline.json"), help="Baseline JSON file"),
+    save_baseline: bool = typer.Option(False, help="Write this run as the new baseline"),
+    tolerance: float = typer.Option(0.25, help="Allowed relative regression before failing"),
+):
+    """Run load scenarios in-process and compare them with the stored baseline"""
+    unknown = set(scenario) - set(SCENARIOS)
+    if unknown:
+        raise typer.BadParameter(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    # Always a fresh, bench-only database (dropped afterwards), never the one DB_NAME points at
+    os.environ["DB_NAME"] = f"yeyo_lab_bench_{uuid.uuid4().hex[:6]}"
+    # Every simulated client shares one address; measure the endpoints, not the rate limiter
+    os.environ.setdefault("AUTH_RATE_LIMIT_PER_IP", "1000000000")
+    os.environ.setdefault("AUTH_RATE_LIMIT_PER_EMAIL", "1000000000")
+    install_database(mongo_url)
+
+    results = asyncio.run(run_benchmark(scenario, requests, concurrency))
+    print_report(results)
+
+    if save_baseline:
+        failed = endpoints_with_errors(results)
+        if failed:
+            typer.echo("\nNot saving a baseline with failed requests:")
+            for line in failed:
+                typer.echo(f"  {line}")
+            raise typer.Exit(code=1)
+        baseline.parent.mkdir(parents=True, exist_ok=True)
+        baseline.write_text(json.dumps(results, indent=2))
+        typer.echo(f"\nBaseline written to {baseline}")
+        return
+
+    if baseline.exists():
+        regressions = compare(results, json.loads(baseline.read_text()), tolerance)
+        if regressions:
+            typer.echo("\nRegressions:")
+            for regression in regressions:
+                typer.echo(f"  {regression}")
+            raise typer.Exit(code=1)
+        typer.echo(f"\nNo regressions against {baseline}")
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,290 @@
+"""
+Micro-benchmarks for auth and model hot paths of the YEYO LAB API
+
+Each benchmark is warmed up, then timed in repeated samples whose loop
+count is calibrated so a sample lasts at least --min-sample-time; the
+median per-call time and the interquartile range are reported. A separate
+tracemalloc pass records the peak memory of a call and any memory it
+retains. A median slowdown beyond --threshold against the recorded history
+fails with exit code 1; only runs without regressions are appended to the
+history, so a failing run never becomes the next baseline.
+"""
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import typer
+
+BACKEND_DIR = Path(__file__).parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+PASSWORD = "BenchPass123"
+
+# A benchmark builds its fixtures once and returns the callable to time
+Benchmark = Callable[[], Callable[[], Any]]
+
+def user_fields() -> Dict[str, Any]:
+    return {
+        "name": "Bench User", "email": "bench@example.com", "user_type": "founder",
+        "company": "Bench Co", "additional_info": "fintech payments platform for African merchants",
+    }
+
+def booking_fields() -> Dict[str, Any]:
+    return {"name": "Bench", "email": "bench@example.com", "date": "2100-01-01", "time": "10:00", "message": "Hello"}
+
+def build_benchmarks(bcrypt_costs: List[int]) -> Dict[str, Benchmark]:
+    import bcrypt
+    from auth import AuthManager, PasswordValidator
+    from models import Booking, User
+    from mongo_codec import from_mongo, to_mongo
+
+    benchmarks: Dict[str, Benchmark] = {}
+
+    def bcrypt_hash(cost: int) -> Benchmark:
+        def setup():
+            password = PASSWORD.encode("utf-8")
+            return lambda: bcrypt.hashpw(password, bcrypt.gensalt(cost))
+        return setup
+
+    def bcrypt_verify(cost: int) -> Benchmark:
+        def setup():
+            hashed = bcrypt.hashpw(PASSWORD.encode("utf-8"), bcrypt.gensalt(cost)).decode("utf-8")
+            return lambda: AuthManager.verify_password(PASSWORD, hashed)
+        return setup
+
+    for cost in bcrypt_costs:
+        benchmarks[f"bcrypt_hash[cost={cost}]"] = bcrypt_hash(cost)
+        benchmarks[f"verify_password[cost={cost}]"] = bcrypt_verify(cost)
+    benchmarks["hash_password[default cost]"] = lambda: (lambda: AuthManager.hash_password(PASSWORD))
+
+    def create_token():
+        user = {"id": str(uuid.uuid4()), **user_fields()}
+        return lambda: AuthManager.create_access_token(user)
+    benchmarks["create_access_token"] = create_token
+
+    def verify_token():
+        token = AuthManager.create_access_token({"id": str(uuid.uuid4()), **user_fields()})
+        return lambda: AuthManager.verify_token(token)
+    benchmarks["verify_token"] = verify_token
+
+    benchmarks["validate_password"] = lambda: (lambda: PasswordValidator.validate_password(PASSWORD))
+
+    def user_to_mongo():
+        user = User(**user_fields())
+        return lambda: to_mongo(user)
+    benchmarks["to_mongo[User]"] = user_to_mongo
+
+    def booking_to_mongo():
+        booking = Booking(**booking_fields())
+        return lambda: to_mongo(booking)
+    benchmarks["to_mongo[Booking]"] = booking_to_mongo
+
+    def user_from_mongo():
+        document = to_mongo(User(**user_fields()))
+        return lambda: from_mongo(dict(document))
+    benchmarks["from_mongo[User]"] = user_from_mongo
+
+    def legacy_from_mongo():
+        # Documents written before the datetime migration carry ISO strings
+        document = {**to_mongo(User(**user_fields())), "created_at": datetime.now(timezone.utc).isoformat()}
+        return lambda: from_mongo(dict(document))
+    benchmarks["from_mongo[User, legacy ISO string]"] = legacy_from_mongo
+
+    benchmarks["User(**fields)"] = lambda: (lambda fields=user_fields(): User(**fields))
+    benchmarks["Booking(**fields)"] = lambda: (lambda fields=booking_fields(): Booking(**fields))
+
+    def user_construct():
+        document = to_mongo(User(**user_fields()))
+        return lambda: User.model_construct(**document)
+    benchmarks["User.model_construct"] = user_construct
+
+    return benchmarks
+
+def calibrate(func: Callable[[], Any], min_sample_time: float) -> int:
+    """Loops per sample so that one sample lasts at least `min_sample_time`"""
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_sample_time:
+            return loops
+        # Aim a little past the target so the next attempt usually succeeds
+        loops = max(loops * 2, int(loops * min_sample_time * 1.2 / max(elapsed, 1e-9)))
+
+def time_samples(func: Callable[[], Any], loops: int, samples: int) -> List[float]:
+    """Per-call seconds for each sample, with the collector paused as timeit does"""
+    results = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(samples):
+            started = time.perf_counter_ns()
+            for _ in range(loops):
+                func()
+            results.append((time.perf_counter_ns() - started) / loops / 1e9)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return results
+
+def measure_allocations(func: Callable[[], Any], loops: int) -> Dict[str, float]:
+    """Peak transient bytes of one call and bytes retained per call, from tracemalloc
+
+    Objects freed by the end of a call bring the traced total back down, so
+    the peak over many calls is the working set of a single call.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()  # first call may populate caches; keep it out of the numbers
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        for _ in range(loops):
+            func()
+        after, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "peak_bytes_per_call": peak - before,
+        "retained_bytes_per_call": (after - before) / loops,
+    }
+
+def run_benchmark(func: Callable[[], Any], warmup: float, min_sample_time: float, samples: int, memory_loops: int) -> Dict[str, Any]:
+    deadline = time.perf_counter() + warmup
+    while time.perf_counter() < deadline:
+        func()
+    loops = calibrate(func, min_sample_time)
+    timings = time_samples(func, loops, samples)
+    quartiles = statistics.quantiles(timings, n=4) if len(timings) > 1 else [timings[0]] * 3
+    return {
+        "loops": loops,
+        "samples": samples,
+        "median_s": statistics.median(timings),
+        "iqr_s": quartiles[2] - quartiles[0],
+        "min_s": min(timings),
+        "ops_per_s": 1 / statistics.median(timings),
+        **measure_allocations(func, min(loops, memory_loops)),
+    }
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=Path(__file__).parent,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def select_baseline(history: List[Dict[str, Any]], against: Optional[str]) -> Dict[str, Dict[str, Any]]:
+    """Per benchmark, its stats from the latest recorded run that measured it
+
+    With `against`, only runs whose revision starts with it are considered.
+    Each entry carries the run's revision (or timestamp) under "source".
+    """
+    baseline: Dict[str, Dict[str, Any]] = {}
+    for run in reversed(history):
+        if against is not None and not (run.get("revision") or "").startswith(against):
+            continue
+        for name, stats in run["results"].items():
+            baseline.setdefault(name, {**stats, "source": run.get("revision") or run["timestamp"]})
+    return baseline
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Dict[str, Any]], threshold: float) -> List[str]:
+    """Benchmarks whose median slowed down by more than `threshold` and by more than the noise"""
+    regressions = []
+    for name, stats in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        slowdown = stats["median_s"] / base["median_s"] - 1
+        # Ignore differences inside the combined interquartile ranges
+        noisy = stats["median_s"] - base["median_s"] <= stats["iqr_s"] + base["iqr_s"]
+        if slowdown > threshold and not noisy:
+            regressions.append(
+                f"{name}: {format_time(stats['median_s'])} vs {format_time(base['median_s'])} "
+                f"at {base['source']} (+{slowdown:.0%})"
+            )
+    return regressions
+
+def format_time(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f}{unit}"
+    return f"{seconds / 1e-9:.0f}ns"
+
+def print_report(results: Dict[str, Any], baseline: Dict[str, Dict[str, Any]]):
+    typer.echo(f"{'benchmark':40} {'median':>10} {'iqr':>10} {'ops/s':>12} {'peak mem':>12} {'vs base':>8}")
+    for name, stats in results.items():
+        change = ""
+        base = baseline.get(name)
+        if base:
+            change = f"{stats['median_s'] / base['median_s'] - 1:+.0%}"
+        typer.echo(
+            f"{name:40} {format_time(stats['median_s']):>10} {format_time(stats['iqr_s']):>10} "
+            f"{stats['ops_per_s']:>12.1f} {stats['peak_bytes_per_call']:>11.0f}B {change:>8}"
+        )
+
+def main(
+    benchmark: List[str] = typer.Option([], "--benchmark", "-b", help="Only run benchmarks whose name contains this"),
+    bcrypt_cost: List[int] = typer.Option([4, 10, 12], help="bcrypt cost factors to measure"),
+    warmup: float = typer.Option(0.2, help="Warmup seconds per benchmark"),
+    min_sample_time: float = typer.Option(0.05, help="Minimum seconds per timing sample"),
+    samples: int = typer.Option(15, help="Timing samples per benchmark"),
+    memory_loops: int = typer.Option(1000, help="Calls measured by tracemalloc (capped at the timing loop count)"),
+    history: Path = typer.Option(Path("benchmarks/micro_history.json"), help="JSON history file"),
+    against: Optional[str] = typer.Option(None, help="Compare with the latest run at this git revision instead of the latest run"),
+    threshold: float = typer.Option(0.15, help="Allowed relative slowdown of the median before failing"),
+    record: bool = typer.Option(True, help="Append this run to the history when it has no regressions"),
+):
+    """Time auth and model primitives and compare them with earlier runs"""
+    benchmarks = build_benchmarks(bcrypt_cost)
+    selected = {name: setup for name, setup in benchmarks.items() if not benchmark or any(part in name for part in benchmark)}
+    if not selected:
+        raise typer.BadParameter("No benchmark matches --benchmark")
+
+    results = {}
+    for name, setup in selected.items():
+        typer.echo(f"running {name}...", err=True)
+        results[name] = run_benchmark(setup(), warmup, min_sample_time, samples, memory_loops)
+
+    runs: List[Dict[str, Any]] = json.loads(history.read_text()) if history.exists() else []
+    baseline = select_baseline(runs, against)
+    print_report(results, baseline)
+
+    if against and not baseline:
+        typer.echo(f"\nNo recorded run at revision {against}; nothing to compare")
+    regressions = compare(results, baseline, threshold)
+    if regressions:
+        typer.echo("\nRegressions (this run is not recorded):")
+        for regression in regressions:
+            typer.echo(f"  {regression}")
+        raise typer.Exit(code=1)
+    if baseline:
+        typer.echo("\nNo regressions")
+
+    if record:
+        runs.append({
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "machine": f"{platform.system()} {platform.machine()} ({os.cpu_count()} cpus)",
+            "results": results,
+        })
+        history.parent.mkdir(parents=True, exist_ok=True)
+        history.write_text(json.dumps(runs, indent=2))
+        typer.echo(f"Run appended to {history}")
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -1,4 +1,4 @@
-import React, { useState } from 'react';
+import React, { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
 import { Button } from './ui/button';
 import { Input } from './ui/input';
@@ -20,6 +20,7 @@ const BookingPage = () => {
   const [selectedDate, setSelectedDate] = useState(null);
   const [selectedTime, setSelectedTime] = useState('');
   const [submitting, setSubmitting] = useState(false);
+  const [bookedSlots, setBookedSlots] = useState([]);
 
   // Available time slots
   const timeSlots = [
@@ -27,6 +28,21 @@ const BookingPage = () => {
     '14:00', '14:30', '15:00', '15:30', '16:00', '16:30'
   ];
 
+  // Load booked slots for the selected day
+  useEffect(() => {
+    if (!selectedDate) {
+      setBookedSlots([]);
+      return;
+    }
+    const day = selectedDate.toISOString().split('T')[0];
+    axios.get(`${API}/bookings/availability`, { params: { from: day, to: day } })
+      .then((response) => {
+        const days = response.data.days || [];
+        setBookedSlots(days.length ? days[0].booked : []);
+      })
+      .catch(() => setBookedSlots([]));
+  }, [selectedDate]);
+
   const handleChange = (e) => {
     setFormData({
       ...formData,
@@ -59,6 +75,12 @@ const BookingPage = () => {
       setSelectedDate(null);
       setSelectedTime('');
     } catch (error) {
+      if (error.response && error.response.status === 409) {
+        toast.error('That time slot was just booked. Please pick another.');
+        setBookedSlots([...bookedSlots, selectedTime]);
+        setSelectedTime('');
+        return;
+      }
       toast.error('Failed to submit booking. Please try again.');
       console.error(error);
     } finally {
@@ -172,10 +194,13 @@ const BookingPage = () => {
                           key={time}
                           type="button"
                           onClick={() => setSelectedTime(time)}
+                          disabled={bookedSlots.includes(time)}
                           className={`p-2 border rounded-md text-sm font-medium transition-colors ${
                             selectedTime === time
                               ? 'bg-blue-500 text-white border-blue-500'
-                              : 'bg-white text-gray-700 border-gray-300 hover:bg-gray-50'
+                              : bookedSlots.includes(time)
+                                ? 'bg-gray-100 text-gray-400 border-gray-200 cursor-not-allowed line-through'
+                                : 'bg-white text-gray-700 border-gray-300 hover:bg-gray-50'
                           }`}
                         >
                           {time}
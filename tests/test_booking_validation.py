@@ -0,0 +1,25 @@
+"""
+Booking slots have one spelling each, so the unique (date, time) index catches every double booking
+"""
+import pytest
+from pydantic import ValidationError
+
+from availability import BOOKING_SLOTS
+from models import BookingCreate
+
+def booking(**fields):
+    return BookingCreate(**{"name": "Ada", "email": "ada@example.com", "date": "2099-01-01", "time": BOOKING_SLOTS[0], **fields})
+
+def test_valid_booking_is_normalized():
+    created = booking(date=" 2099-01-01 ", time=f" {BOOKING_SLOTS[0]} ")
+    assert (created.date, created.time) == ("2099-01-01", BOOKING_SLOTS[0])
+
+@pytest.mark.parametrize("date", ["2099-1-1", "01/01/2099", "2099-02-30", "tomorrow", ""])
+def test_rejects_non_iso_dates(date):
+    with pytest.raises(ValidationError):
+        booking(date=date)
+
+@pytest.mark.parametrize("time", ["10:0", "13:37", "10:00:00", "9:00", ""])
+def test_rejects_times_outside_the_slots(time):
+    with pytest.raises(ValidationError):
+        booking(time=time)
@@ -0,0 +1,61 @@
+"""
+Sparse profile rows behind the investor/founder match index
+"""
+import random
+
+import numpy as np
+
+from matching import MatchIndex, _Side, hash_terms, weigh
+
+FEATURES = 64
+
+def random_terms(rng):
+    count = rng.randint(0, 6)
+    indices = np.array(rng.sample(range(FEATURES), count), dtype=np.int32)
+    values = np.array([rng.uniform(-2, 2) for _ in range(count)], dtype=np.float32)
+    return indices, values
+
+def test_scores_match_dense_rows_through_updates_and_compaction():
+    rng = random.Random(3)
+    idf = np.ones(FEATURES, dtype=np.float32)
+    # Tiny capacities so rows are reused and entries are compacted and grown many times
+    side = _Side(FEATURES, capacity=2, entry_capacity=8)
+    dense = {}
+    for step in range(500):
+        user_id = f"u{rng.randint(0, 40)}"
+        if rng.random() < 0.25:
+            side.remove(user_id)
+            dense.pop(user_id, None)
+            continue
+        terms = random_terms(rng)
+        side.put(user_id, weigh([terms], idf))
+        vector = np.zeros(FEATURES, dtype=np.float32)
+        vector[terms[0]] = terms[1]
+        norm = np.linalg.norm(vector)
+        dense[user_id] = vector / norm if norm else vector
+
+        query = side.vector(user_id)
+        np.testing.assert_allclose(query, dense[user_id], atol=1e-6)
+        scores = side.scores(query)
+        for other, row in side.rows.items():
+            assert abs(scores[row] - dense[other] @ dense[user_id]) < 1e-5
+    assert side.live == sum(int(side.lengths[row]) for row in side.rows.values())
+    assert side.used <= len(side.values)
+
+def test_weigh_normalizes_each_row():
+    idf = np.linspace(1, 2, FEATURES).astype(np.float32)
+    lengths, indices, values = weigh([hash_terms("fintech payments", FEATURES), (np.zeros(0, np.int32), np.zeros(0, np.float32))], idf)
+    assert list(lengths) == [len(indices), 0]
+    assert abs(float(np.linalg.norm(values)) - 1) < 1e-6
+
+def test_top_k_ranks_the_closest_counterparts():
+    index = MatchIndex(features=1024)
+    index.upsert({"id": "f1", "user_type": "founder", "additional_info": "fintech payments wallet for merchants"})
+    index.upsert({"id": "i1", "user_type": "investor", "additional_info": "we back fintech payments wallet startups"})
+    index.upsert({"id": "i2", "user_type": "investor", "additional_info": "climate energy storage"})
+    index.upsert({"id": "i3", "user_type": "investor", "additional_info": "fintech lending"})
+    ranked = [match["user"]["id"] for match in index.top_k("f1", "founder", 5)]
+    assert ranked == ["i1", "i3"]
+
+    index.upsert({"id": "i1", "user_type": "pending"})
+    assert [match["user"]["id"] for match in index.top_k("f1", "founder", 5)] == ["i3"]
@@ -0,0 +1,61 @@
+"""
+Interval tasks and serialized snapshot reloads shared by the background services
+"""
+import asyncio
+
+from periodic import PeriodicTask, Reloader
+
+def test_periodic_task_keeps_running_after_a_failure():
+    calls = []
+
+    async def action():
+        calls.append(len(calls))
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+
+    async def scenario():
+        task = PeriodicTask("test", action, 0.01, run_first=True)
+        task.start()
+        await asyncio.sleep(0.05)
+        await task.stop()
+        stopped_at = len(calls)
+        await asyncio.sleep(0.03)
+        return stopped_at
+
+    stopped_at = asyncio.run(scenario())
+    assert stopped_at >= 2
+    assert len(calls) == stopped_at
+
+def test_periodic_task_waits_one_interval_unless_run_first():
+    calls = []
+
+    async def action():
+        calls.append(1)
+
+    async def scenario():
+        task = PeriodicTask("test", action, 10)
+        task.start()
+        await asyncio.sleep(0.01)
+        await task.stop()
+
+    asyncio.run(scenario())
+    assert calls == []
+
+def test_reloader_reuses_a_fresh_load():
+    loads = []
+
+    async def load():
+        await asyncio.sleep(0.01)
+        loads.append(1)
+
+    async def scenario():
+        reloader = Reloader("test", 60)
+        # Concurrent callers queue on the lock; only the first one loads
+        ran = await asyncio.gather(*(reloader.run(load, max_age=60) for _ in range(3)))
+        await reloader.ensure(load)
+        assert await reloader.run(load)
+        return ran
+
+    ran = asyncio.run(scenario())
+    assert ran == [True, False, False]
+    assert len(loads) == 2
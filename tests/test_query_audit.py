@@ -0,0 +1,139 @@
+"""
+Query audit: drive every API route against mongod and fail on any collection scan
+
+Needs a reachable mongod at TEST_MONGO_URL (default mongodb://localhost:27017)
+and is skipped without one. The run uses its own database, dropped afterwards.
+"""
+import asyncio
+import os
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("motor")
+pytest.importorskip("httpx")
+
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+MONGO_URL = os.environ.get("TEST_MONGO_URL", "mongodb://localhost:27017")
+ADMIN_EMAIL = "audit-admin@example.com"
+PASSWORD = "AuditPass123"
+
+def mongod_available() -> bool:
+    client = MongoClient(MONGO_URL, serverSelectionTimeoutMS=1000)
+    try:
+        client.admin.command("ping")
+        return True
+    except PyMongoError:
+        return False
+    finally:
+        client.close()
+
+pytestmark = pytest.mark.skipif(not mongod_available(), reason=f"No mongod at {MONGO_URL}")
+
+class RouteRecorder:
+    """ASGI wrapper remembering which endpoints the router dispatched to"""
+
+    def __init__(self, app):
+        self.app = app
+        self.endpoints = set()
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            # The router adds the matched endpoint to the (shared) scope
+            if scope["type"] == "http" and "endpoint" in scope:
+                self.endpoints.add(scope["endpoint"])
+
+def check(response):
+    assert response.status_code < 500, f"{response.request.method} {response.request.url}: {response.status_code} {response.text}"
+    return response
+
+def exercise(http):
+    """Call every /api route at least once, with the filters and pages each one supports"""
+    check(http.get("/api/"))
+    check(http.get("/api/health"))
+    check(http.get("/api/health/live"))
+    check(http.get("/api/health/ready"))
+    check(http.get("/api/metrics"))
+
+    registered = check(http.post("/api/auth/register", json={
+        "name": "Audit Admin", "email": ADMIN_EMAIL, "password": PASSWORD, "user_type": "founder",
+        "additional_info": "fintech payments platform",
+    })).json()
+    check(http.post("/api/auth/register", json={
+        "name": "Audit Investor", "email": f"audit-{uuid.uuid4().hex[:8]}@example.com", "password": PASSWORD,
+        "user_type": "investor", "additional_info": "we back fintech payments startups",
+    }))
+    login = check(http.post("/api/auth/login", json={"email": ADMIN_EMAIL, "password": PASSWORD})).json()
+    refreshed = check(http.post("/api/auth/refresh", json={"refresh_token": login["refresh_token"]})).json()
+    headers = {"Authorization": f"Bearer {registered['access_token']}"}
+
+    check(http.get("/api/auth/profile", headers=headers))
+    check(http.put("/api/auth/profile", json={"company": "Audit Co"}, headers=headers))
+    check(http.post("/api/register/investor", json={"additional_info": "audit"}, headers=headers))
+    check(http.post("/api/register/founder", json={"additional_info": "fintech payments wallet"}, headers=headers))
+    check(http.get("/api/matches", headers=headers))
+
+    booking = {"name": "Audit", "email": ADMIN_EMAIL, "date": "2099-01-01", "time": "10:00"}
+    check(http.post("/api/bookings", json=booking))
+    check(http.post("/api/bookings", json=booking))  # double booking
+    check(http.post("/api/bookings/batch", json=[{**booking, "time": "10:30"}, {**booking, "time": "11:00"}], headers=headers))
+    check(http.get("/api/bookings/availability", params={"from": "2099-01-01", "to": "2099-01-07"}))
+    page = check(http.get("/api/bookings", params={"limit": 1}, headers=headers))
+    check(http.get("/api/bookings", params={"limit": 1, "after": page.headers["X-Next-Cursor"]}, headers=headers))
+    check(http.get("/api/bookings", params={"date_from": "2099-01-01", "date_to": "2099-12-31"}, headers=headers))
+    check(http.get("/api/bookings", params={"format": "ndjson"}, headers=headers))
+    check(http.get("/api/bookings", headers={**headers, "If-None-Match": page.headers["ETag"]}))
+
+    check(http.post("/api/email-subscribe", json={"email": ADMIN_EMAIL}))
+    check(http.get("/api/admin/export/bookings", headers=headers))
+    check(http.get("/api/admin/stats", headers=headers))
+    check(http.post("/api/auth/logout", json={"refresh_token": refreshed["refresh_token"]}))
+
+def test_every_route_uses_indexes(monkeypatch):
+    monkeypatch.setenv("MONGO_URL", MONGO_URL)
+    monkeypatch.setenv("DB_NAME", f"yeyo_lab_audit_{uuid.uuid4().hex[:8]}")
+    monkeypatch.setenv("ADMIN_EMAILS", ADMIN_EMAIL)
+    monkeypatch.setenv("AUTH_RATE_LIMIT_PER_IP", "1000000")
+    monkeypatch.setenv("AUTH_RATE_LIMIT_PER_EMAIL", "1000000")
+    monkeypatch.syspath_prepend(str(BACKEND_DIR))
+    if "server" in sys.modules:
+        pytest.skip("server was imported before the auditor could attach to the Mongo client")
+
+    from database import registry
+    from query_audit import QueryAuditor
+
+    auditor = QueryAuditor()
+    registry.add_listener(auditor)
+
+    from fastapi.routing import APIRoute
+    from fastapi.testclient import TestClient
+    import server
+
+    recorder = RouteRecorder(server.app)
+    try:
+        # Startup queries (slot calendar, match index) and the subscription flush at shutdown are audited too
+        with TestClient(recorder) as http:
+            exercise(http)
+
+        routes = {route.endpoint: f"{','.join(sorted(route.methods))} {route.path}"
+                  for route in server.app.routes if isinstance(route, APIRoute)}
+        missed = sorted(path for endpoint, path in routes.items() if endpoint not in recorder.endpoints)
+        assert not missed, f"exercise() does not call: {', '.join(missed)}"
+
+        async def audit():
+            client = registry.get_client()
+            try:
+                await auditor.assert_no_collscans(client)
+            finally:
+                await client.drop_database(os.environ["DB_NAME"])
+
+        asyncio.run(audit())
+    finally:
+        registry.close()
@@ -0,0 +1,72 @@
+"""
+Window counters and the sliding-window estimate behind auth admission control
+"""
+import asyncio
+import time
+
+import ratelimit
+from ratelimit import InMemoryLimiterStore, SlidingWindowLimiter
+
+def hit(store, key, window_start, window=60):
+    return asyncio.run(store.hit(key, window_start, window))
+
+def test_counts_hits_per_key_and_window():
+    store = InMemoryLimiterStore()
+    assert hit(store, "a", 0) == (1, 0)
+    assert hit(store, "a", 0) == (2, 0)
+    assert hit(store, "b", 0) == (1, 0)
+
+def test_next_window_sees_previous_counts():
+    store = InMemoryLimiterStore()
+    for _ in range(3):
+        hit(store, "a", 0)
+    assert hit(store, "a", 60) == (1, 3)
+    assert hit(store, "b", 60) == (1, 0)
+
+def test_counts_older_than_the_previous_window_are_dropped():
+    store = InMemoryLimiterStore()
+    hit(store, "a", 0)
+    assert hit(store, "a", 120) == (1, 0)
+
+def test_window_lengths_are_counted_separately():
+    store = InMemoryLimiterStore()
+    hit(store, "a", 0, window=60)
+    assert hit(store, "a", 10, window=10) == (1, 0)
+    assert hit(store, "a", 0, window=60) == (2, 0)
+
+def test_key_count_is_bounded_by_forgetting_the_oldest_key():
+    store = InMemoryLimiterStore(max_keys=3)
+    for key in "abcd":
+        hit(store, key, 0)
+    assert hit(store, "a", 0) == (1, 0)  # forgotten to make room for "d"
+    assert hit(store, "d", 0) == (2, 0)
+
+def test_hits_stay_cheap_with_many_distinct_keys():
+    store = InMemoryLimiterStore(max_keys=1000)
+
+    async def spray():
+        for index in range(50000):
+            await store.hit(f"email:{index}", 0, 60)
+    started = time.perf_counter()
+    asyncio.run(spray())
+    # A full rebuild per hit (the old prune) took tens of seconds here
+    assert time.perf_counter() - started < 5
+
+def check(limiter, key, now, monkeypatch):
+    monkeypatch.setattr(ratelimit.time, "time", lambda: now)
+    return asyncio.run(limiter.check(key))
+
+def test_allows_up_to_the_limit_then_asks_to_retry(monkeypatch):
+    limiter = SlidingWindowLimiter(InMemoryLimiterStore(), limit=3, window=60)
+    assert [check(limiter, "ip", 600, monkeypatch) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert check(limiter, "ip", 615, monkeypatch) == 45
+    assert check(limiter, "other", 615, monkeypatch) == 0.0
+
+def test_previous_window_is_weighted_by_its_overlap(monkeypatch):
+    limiter = SlidingWindowLimiter(InMemoryLimiterStore(), limit=4, window=60)
+    for _ in range(4):
+        check(limiter, "ip", 600, monkeypatch)
+    # Halfway into the next window the previous 4 hits weigh 2, so 2 more fit
+    assert check(limiter, "ip", 690, monkeypatch) == 0.0
+    assert check(limiter, "ip", 690, monkeypatch) == 0.0
+    assert check(limiter, "ip", 690, monkeypatch) == 30
@@ -0,0 +1,26 @@
+"""
+Rejection reports written by the bulk user import
+"""
+import json
+import os
+import stat
+
+from user_import import ImportReport
+
+def test_report_omits_passwords_and_is_private(tmp_path):
+    path = tmp_path / "reports" / "cohort.rejected.jsonl"
+    report = ImportReport(path)
+    report.reject(3, "email: invalid", {"name": "A", "email": "bad", "password": "Secret123x", " Password ": "x"})
+    report.close()
+
+    assert json.loads(path.read_text()) == {"line": 3, "error": "email: invalid", "row": {"name": "A", "email": "bad"}}
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+def test_existing_report_is_truncated_and_tightened(tmp_path):
+    path = tmp_path / "cohort.rejected.jsonl"
+    path.write_text("stale\n")
+    os.chmod(path, 0o644)
+    ImportReport(path).close()
+
+    assert path.read_text() == ""
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600